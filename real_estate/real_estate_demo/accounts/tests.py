@@ -1,3 +1,32 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+
+from properties.models import Agent, Favorite, Location, Property, PropertyType
+
+
+class PersonalizationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        agent = Agent.objects.create(user=User.objects.create_user('agent'), phone='123')
+        self.property = Property.objects.create(
+            title='House', slug='house', description='Description',
+            property_type=PropertyType.objects.create(name='House', slug='house'),
+            location=Location.objects.create(name='Dhaka', slug='dhaka'),
+            address='1 Road', price=Decimal('100000'), bedrooms=3, bathrooms=Decimal('2.0'),
+            area_sqft=1500, agent=agent,
+        )
+
+    def test_anonymous(self):
+        response = self.client.get(reverse('personalization'))
+        self.assertEqual(response.json(), {'status': 'success', 'authenticated': False})
 
-# Create your tests here.
+    def test_signed_in_user_and_favorites(self):
+        Favorite.objects.create(user=self.user, property=self.property)
+        self.client.login(username='buyer', password='password')
+        response = self.client.get(reverse('personalization'))
+        data = response.json()
+        self.assertEqual((data['username'], data['is_staff'], data['favorites']), ('buyer', False, [self.property.pk]))
+        self.assertIn('no-cache', response['Cache-Control'])
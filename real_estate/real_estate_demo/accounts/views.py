@@ -3,6 +3,9 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from properties.models import Favorite
 
 
 def login_view(request):
@@ -77,3 +80,18 @@ def register_view(request):
 @login_required
 def profile_view(request):
     return render(request, 'accounts/profile.html')
+
+
+@never_cache
+def personalization_view(request):
+    """User specific parts of cached pages, filled in by main.js."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'status': 'success', 'authenticated': False})
+
+    return JsonResponse({
+        'status': 'success',
+        'authenticated': True,
+        'username': request.user.username,
+        'is_staff': request.user.is_staff,
+        'favorites': list(Favorite.objects.filter(user=request.user).values_list('property_id', flat=True)),
+    })
@@ -1,6 +1,7 @@
 from django.shortcuts import render
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from core.pagination import CursorPaginationMixin
 from properties.models import Property, Inquiry
 
 
@@ -15,7 +16,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         return context
 
 
-class AdminPropertyListView(LoginRequiredMixin, ListView):
+class AdminPropertyListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Property
     template_name = 'admin_portal/property_list.html'
     context_object_name = 'properties'
@@ -34,7 +35,7 @@ class AdminPropertyUpdateView(LoginRequiredMixin, UpdateView):
     fields = '__all__'
 
 
-class AdminInquiryListView(LoginRequiredMixin, ListView):
+class AdminInquiryListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Inquiry
     template_name = 'admin_portal/inquiry_list.html'
     context_object_name = 'inquiries'
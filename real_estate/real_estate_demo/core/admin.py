@@ -1,3 +1,17 @@
 from django.contrib import admin
+from .models import Job, OutboxEmail
 
-# Register your models here.
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject']
+    readonly_fields = ['created_at', 'sent_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'run_at', 'attempts', 'duration_ms', 'worker', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'duration_ms', 'worker']
@@ -0,0 +1,274 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.http.response import HttpResponseBase
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .signals import tags_invalidated
+
+
+TAG_PREFIX = 'tag:'
+
+# Entries are dropped by their tags; the timeout only bounds what a missed
+# invalidation can cost
+PAGE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Browsers and the CDN may reuse a page only after revalidating it (a 304 costs
+# one cache read)
+PAGE_CACHE_CONTROL = 'max-age=0, must-revalidate'
+
+# While one worker recomputes a missing or stale entry the others wait this
+# long (seconds) for it when they have nothing stale to serve
+SINGLE_FLIGHT_LOCK_TIMEOUT = 30
+SINGLE_FLIGHT_WAIT = 5
+SINGLE_FLIGHT_POLL = 0.05
+
+METRIC_PREFIX = 'metrics:cache:'
+METRICS = ('hit', 'miss', 'stale', 'stale_on_error', 'coalesced')
+
+CSRF_PLACEHOLDER = '__csrf_token__'
+CSRF_INPUT = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def object_tag(obj):
+    """Tag for a single model instance, e.g. "property:12"."""
+    return f'{obj._meta.model_name}:{obj.pk}'
+
+
+def tag_versions(tags):
+    """Current version of each tag, creating the ones not seen yet."""
+    keys = {tag: TAG_PREFIX + tag for tag in tags}
+    versions = cache.get_many(keys.values())
+    missing = [key for key in keys.values() if key not in versions]
+    if missing:
+        # Start from the clock rather than 1, so a tag evicted from the cache
+        # can't come back at a version an old entry was stored with
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(missing))
+    return {tag: versions.get(key) for tag, key in keys.items()}
+
+
+def invalidate_tags(*tags):
+    """Expire every entry stored with any of ``tags``."""
+    for tag in tags:
+        try:
+            cache.incr(TAG_PREFIX + tag)
+        except ValueError:
+            cache.set(TAG_PREFIX + tag, time.time_ns(), None)
+    # Lets a CDN integration purge pages by the same tags (see Surrogate-Key)
+    tags_invalidated.send(sender=None, tags=tags)
+
+
+def read_tagged(key):
+    """(value, fresh) stored under ``key``; fresh is False once one of its tags changed."""
+    entry = cache.get(key)
+    if entry is None:
+        return None, False
+    value, versions = entry
+    return value, tag_versions(versions) == versions
+
+
+def get_tagged(key):
+    """Value stored under ``key``, or None if it is missing or one of its tags changed."""
+    value, fresh = read_tagged(key)
+    return value if fresh else None
+
+
+def set_tagged(key, value, versions, timeout=PAGE_CACHE_TIMEOUT):
+    """Store ``value`` along with the tag versions it was computed from."""
+    cache.set(key, (value, versions), timeout)
+
+
+def record_metric(name):
+    try:
+        cache.incr(METRIC_PREFIX + name)
+    except ValueError:
+        cache.add(METRIC_PREFIX + name, 0, None)
+        cache.incr(METRIC_PREFIX + name)
+
+
+def cache_metrics():
+    counts = cache.get_many([METRIC_PREFIX + name for name in METRICS])
+    return {name: counts.get(METRIC_PREFIX + name, 0) for name in METRICS}
+
+
+def reset_cache_metrics():
+    cache.delete_many([METRIC_PREFIX + name for name in METRICS])
+
+
+def single_flight(key, compute, timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Tagged cache read where only one worker at a time recomputes a miss.
+
+    ``compute()`` returns ``(value, versions)``; with ``versions`` None the
+    value is returned but not stored. While one worker recomputes, the
+    others serve the stale value if there is one (stale-while-revalidate)
+    or wait briefly for the fresh one. If recomputing fails with a database
+    error the stale value is served instead.
+    """
+    value, fresh = read_tagged(key)
+    if fresh:
+        record_metric('hit')
+        return value
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, SINGLE_FLIGHT_LOCK_TIMEOUT):
+        if value is not None:
+            record_metric('stale')
+            return value
+        deadline = time.monotonic() + SINGLE_FLIGHT_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(SINGLE_FLIGHT_POLL)
+            value, fresh = read_tagged(key)
+            if fresh:
+                record_metric('coalesced')
+                return value
+        # The other worker is taking too long; compute without the lock
+        lock_key = None
+
+    try:
+        new_value, versions = compute()
+    except DatabaseError:
+        if value is None:
+            raise
+        record_metric('stale_on_error')
+        return value
+    finally:
+        if lock_key:
+            cache.delete(lock_key)
+
+    record_metric('miss')
+    if versions is not None:
+        set_tagged(key, new_value, versions, timeout)
+    return new_value
+
+
+class ReferenceCache:
+    """
+    Two-tier cache for rarely changing data: a per-process LRU in front of
+    the shared cache backend.
+
+    Every entry belongs to a tag. Reads check the tag's version (one shared
+    cache lookup) and reuse the local copy while it matches, so a bump from
+    any worker makes the others reload lazily on their next read.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, tag, key, loader, timeout=PAGE_CACHE_TIMEOUT):
+        version = tag_versions([tag])[tag]
+        local_key = (tag, key)
+        with self.lock:
+            entry = self.entries.get(local_key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(local_key)
+                return entry[1]
+
+        shared_key = f'ref:{tag}:{key}:{version}'
+        value = cache.get(shared_key)
+        if value is None:
+            value = loader()
+            cache.set(shared_key, value, timeout)
+
+        with self.lock:
+            self.entries[local_key] = (version, value)
+            self.entries.move_to_end(local_key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+reference_cache = ReferenceCache()
+
+
+def is_cacheable_request(request):
+    """GETs without flash messages waiting to be shown."""
+    return request.method in ('GET', 'HEAD') and not len(get_messages(request))
+
+
+def page_cache_key(request):
+    query = urlencode(sorted((key, value) for key, values in request.GET.lists() for value in values))
+    return 'page:' + hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+
+
+class CachedPageMixin:
+    """
+    Serve the rendered page from the cache, one entry shared by every visitor.
+
+    ``page_cache_tags`` are the tags every page of the view depends on; views
+    add the ones that depend on what they rendered (e.g. the listings shown)
+    with ``add_cache_tags()``. Templates see ``shared_page`` and must leave
+    anything user specific to the personalization endpoint. CSRF tokens are
+    stored as a placeholder and filled in per visitor.
+
+    Responses carry an ETag (hash of the page) and Last-Modified (when it was
+    rendered, so never older than any change it depends on), and conditional
+    requests for a cached page get a 304 without rendering anything. The tags
+    are sent as Surrogate-Key for CDN purges.
+    """
+    page_cache_tags = ()
+    page_cache_timeout = PAGE_CACHE_TIMEOUT
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.cache_tags = set()
+
+    def add_cache_tags(self, *tags):
+        self.cache_tags.update(tags)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['shared_page'] = True
+        return context
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        def render():
+            # Read the view's own tags before rendering so a change made
+            # meanwhile leaves the entry already stale
+            versions = tag_versions(self.page_cache_tags)
+            response = super(CachedPageMixin, self).dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            if response.status_code != 200 or response.cookies or response.streaming:
+                return response, None
+            versions.update(tag_versions(self.cache_tags - versions.keys()))
+            content = CSRF_INPUT.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', response.content.decode(response.charset))
+            return {
+                'content': content,
+                'content_type': response['Content-Type'],
+                'etag': f'"{hashlib.md5(content.encode()).hexdigest()}"',
+                'last_modified': int(time.time()),
+                'tags': sorted(versions),
+            }, versions
+
+        cached = single_flight(page_cache_key(request), render, self.page_cache_timeout)
+        if isinstance(cached, HttpResponseBase):
+            return cached
+        content = cached['content'].replace(CSRF_PLACEHOLDER, get_token(request))
+        response = HttpResponse(content, content_type=cached['content_type'])
+        response['ETag'] = cached['etag']
+        response['Last-Modified'] = http_date(cached['last_modified'])
+        response['Cache-Control'] = PAGE_CACHE_CONTROL
+        response['Surrogate-Key'] = ' '.join(cached['tags'])
+        return get_conditional_response(request, cached['etag'], cached['last_modified'], response)
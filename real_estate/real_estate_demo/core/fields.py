@@ -0,0 +1,73 @@
+import os
+
+from django import forms
+from django.core.files import File
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+from django.utils.crypto import get_random_string
+
+from .media import MediaImage, media_backend
+
+
+class MediaImageDescriptor(DeferredAttribute):
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if instance is not None and isinstance(value, str) and value and not isinstance(value, MediaImage):
+            value = instance.__dict__[self.field.attname] = MediaImage(value)
+        return value
+
+
+class MediaImageField(models.Field):
+    """
+    An image kept by the media backend (settings.MEDIA_BACKEND). The column
+    holds the name the backend stored it under, so switching backends needs
+    no migration; values read back are ``MediaImage`` objects with ``url``
+    and ``variant_url()``. Files assigned to the field (e.g. from an admin
+    upload) are stored under ``folder`` on save.
+    """
+    descriptor_class = MediaImageDescriptor
+
+    def __init__(self, verbose_name=None, folder='', **kwargs):
+        self.folder = folder
+        kwargs['max_length'] = 255
+        super().__init__(verbose_name, **kwargs)
+
+    def get_internal_type(self):
+        return 'CharField'
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs['max_length']
+        if self.folder:
+            kwargs['folder'] = self.folder
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if isinstance(value, str) and value and not isinstance(value, MediaImage):
+            return MediaImage(value)
+        return value
+
+    def get_prep_value(self, value):
+        if not value:
+            return None if self.null else ''
+        return str(value)
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if isinstance(value, File):
+            extension = os.path.splitext(value.name)[1].lower()
+            name = os.path.join(self.folder, f'{get_random_string(16).lower()}{extension}')
+            value = MediaImage(media_backend().save(name, value))
+            setattr(model_instance, self.attname, value)
+        return value
+
+    def save_form_data(self, instance, data):
+        # None means the widget was left alone; False means "clear"
+        if data is not None:
+            setattr(instance, self.name, data or self.get_prep_value(data))
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'form_class': forms.ImageField, **kwargs})
@@ -0,0 +1,233 @@
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+READY_KEY = 'jobs:ready'
+
+# A job still running after this long is assumed to have lost its worker
+JOB_TIMEOUT = timedelta(minutes=30)
+
+# Due jobs read per claim, for databases without SKIP LOCKED where several
+# workers may race for the first one
+CLAIM_CANDIDATES = 10
+
+# Retries wait 10s, 20s, 40s, ...
+RETRY_BASE = timedelta(seconds=10)
+
+registry = {}
+
+
+class JobDefinition:
+    def __init__(self, func, name, every=None, max_attempts=3, setting=None):
+        self.func = func
+        self.name = name
+        self.every = every
+        self.max_attempts = max_attempts
+        self.setting = setting
+
+    @property
+    def periodic(self):
+        """Whether the job is scheduled every ``every``; off while its setting is false."""
+        return self.every is not None and (self.setting is None or bool(getattr(settings, self.setting, False)))
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue a call to run as soon as a worker is free."""
+        return enqueue(self, args, kwargs)
+
+    def schedule(self, countdown, *args, dedupe_key=None, **kwargs):
+        """Queue a call to run after ``countdown`` (a timedelta)."""
+        return enqueue(self, args, kwargs, run_at=timezone.now() + countdown, dedupe_key=dedupe_key)
+
+
+def job(func=None, *, name=None, every=None, max_attempts=3, setting=None):
+    """
+    Register a function as a background job::
+
+        @job
+        def reindex_location(location_id): ...
+
+        reindex_location.delay(location.pk)
+
+    ``every`` (a timedelta) makes it periodic: each run queues the next one.
+    With ``setting``, it is only scheduled while that setting is true.
+    Arguments must be JSON serializable.
+    """
+    def register(func):
+        definition = JobDefinition(func, name or f'{func.__module__}.{func.__name__}', every, max_attempts, setting)
+        registry[definition.name] = definition
+        return definition
+    return register(func) if func is not None else register
+
+
+def _redis():
+    url = getattr(settings, 'JOBS_REDIS_URL', None)
+    if not url:
+        return None
+    import redis
+    return redis.Redis.from_url(url)
+
+
+def _notify():
+    client = _redis()
+    if client is not None:
+        client.lpush(READY_KEY, 1)
+        client.ltrim(READY_KEY, 0, 99)
+
+
+def enqueue(definition, args=(), kwargs=None, run_at=None, dedupe_key=None):
+    """
+    Queue a job in the current transaction. With ``dedupe_key``, nothing is
+    queued (and None returned) while a job with the same key is waiting;
+    once a worker takes it, the next call queues a new one.
+    """
+    if getattr(settings, 'JOBS_EAGER', False):
+        definition(*args, **(kwargs or {}))
+        return None
+    try:
+        with transaction.atomic():
+            queued = Job.objects.create(
+                name=definition.name,
+                args=list(args),
+                kwargs=kwargs or {},
+                run_at=run_at or timezone.now(),
+                dedupe_key=dedupe_key,
+                max_attempts=definition.max_attempts,
+            )
+    except IntegrityError:
+        if dedupe_key is None:
+            raise
+        return None
+    transaction.on_commit(_notify)
+    return queued
+
+
+def schedule_periodic():
+    """Queue a first run of every periodic job that has none queued."""
+    for definition in registry.values():
+        if definition.periodic:
+            enqueue(definition, dedupe_key=f'periodic:{definition.name}')
+
+
+def requeue_stale():
+    """Put back jobs whose worker died while running them."""
+    return Job.objects.filter(status='running', started_at__lt=timezone.now() - JOB_TIMEOUT).update(
+        status='queued', run_at=timezone.now(),
+    )
+
+
+def claim(worker):
+    """Take the next due job, locking it so no other worker can."""
+    with transaction.atomic():
+        queryset = Job.objects.filter(status='queued', run_at__lte=timezone.now())
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        for claimed in queryset.order_by('run_at', 'id')[:CLAIM_CANDIDATES]:
+            changes = {
+                'status': 'running',
+                'worker': worker,
+                'attempts': claimed.attempts + 1,
+                'started_at': timezone.now(),
+                'dedupe_key': None,
+            }
+            # Without SKIP LOCKED another worker may have read the same row;
+            # only the one whose update matches gets it
+            if Job.objects.filter(pk=claimed.pk, status='queued').update(**changes):
+                for name, value in changes.items():
+                    setattr(claimed, name, value)
+                return claimed
+    return None
+
+
+def run(claimed):
+    """Run a claimed job and record its outcome and duration."""
+    definition = registry.get(claimed.name)
+    start = time.perf_counter()
+    error = None
+    if definition is None:
+        error = f'Unknown job {claimed.name}'
+    else:
+        try:
+            definition(*claimed.args, **claimed.kwargs)
+        except Exception as e:
+            logger.exception('Job %s (%s) failed', claimed.pk, claimed.name)
+            error = f'{type(e).__name__}: {e}'
+
+    claimed.finished_at = timezone.now()
+    claimed.duration_ms = int((time.perf_counter() - start) * 1000)
+    fields = ['status', 'finished_at', 'duration_ms', 'last_error', 'run_at']
+    with transaction.atomic():
+        if error is None:
+            claimed.status = 'done'
+        elif definition is not None and claimed.attempts < claimed.max_attempts:
+            claimed.status = 'queued'
+            claimed.run_at = claimed.finished_at + RETRY_BASE * 2 ** (claimed.attempts - 1)
+        else:
+            claimed.status = 'failed'
+        claimed.last_error = error or ''
+        claimed.save(update_fields=fields)
+
+        if claimed.status != 'queued' and definition is not None and definition.periodic:
+            enqueue(definition, run_at=claimed.finished_at + definition.every, dedupe_key=f'periodic:{definition.name}')
+    return claimed
+
+
+def wait(interval):
+    """Sleep until new work is announced (with Redis) or ``interval`` seconds pass."""
+    client = _redis()
+    if client is None:
+        time.sleep(interval)
+    else:
+        client.brpop(READY_KEY, timeout=max(int(interval), 1))
+
+
+def work(burst=False, interval=1.0):
+    """Claim and run jobs until stopped; with ``burst``, stop once nothing is due."""
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    schedule_periodic()
+    requeue_stale()
+    while True:
+        claimed = claim(worker)
+        if claimed is not None:
+            run(claimed)
+            logger.info('%s %s in %d ms', claimed.name, claimed.status, claimed.duration_ms)
+            continue
+        if burst:
+            return
+        requeue_stale()
+        wait(interval)
+
+
+@job(every=timedelta(days=1))
+def purge_finished_jobs(days=7):
+    """Delete jobs that finished more than ``days`` ago."""
+    Job.objects.filter(status__in=['done', 'failed'], finished_at__lt=timezone.now() - timedelta(days=days)).delete()
+
+
+def job_stats(since):
+    """Runs, failures and timings per job name since ``since``."""
+    return list(
+        Job.objects.filter(finished_at__gte=since)
+        .values('name')
+        .annotate(
+            runs=Count('id'),
+            failures=Count('id', filter=Q(status='failed')),
+            avg_ms=Avg('duration_ms'),
+            max_ms=Max('duration_ms'),
+        )
+        .order_by('name')
+    )
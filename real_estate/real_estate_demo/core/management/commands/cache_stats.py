@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.cache import cache_metrics, reset_cache_metrics
+
+
+class Command(BaseCommand):
+    help = 'Show how cached pages were served: hits, misses, stale serves and coalesced waits'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after showing them')
+
+    def handle(self, *args, **options):
+        metrics = cache_metrics()
+        for name, count in metrics.items():
+            self.stdout.write(f'{name}: {count}')
+        served = metrics['hit'] + metrics['stale'] + metrics['stale_on_error'] + metrics['coalesced']
+        total = served + metrics['miss']
+        if total:
+            self.stdout.write(self.style.SUCCESS(f'Served without rendering: {served / total:.1%}'))
+        if options['reset']:
+            reset_cache_metrics()
@@ -0,0 +1,56 @@
+import multiprocessing
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from core.jobs import job_stats, work
+
+
+def run_worker(burst, interval):
+    # Children must not share the parent's database connections
+    connections.close_all()
+    work(burst=burst, interval=interval)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes (default 1)')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+        parser.add_argument('--interval', type=float, default=1, help='Seconds between polls when idle (default 1)')
+        parser.add_argument('--stats', action='store_true', help='Show runs and timings per job for the last day and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.show_stats()
+            return
+
+        if options['processes'] <= 1:
+            work(burst=options['burst'], interval=options['interval'])
+            return
+
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(options['burst'], options['interval']), daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(f'Started {len(workers)} workers'))
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+
+    def show_stats(self):
+        rows = job_stats(timezone.now() - timedelta(days=1))
+        self.stdout.write(f'{"job":50}{"runs":>6}{"failed":>8}{"avg ms":>9}{"max ms":>9}')
+        for row in rows:
+            self.stdout.write(
+                f'{row["name"]:50}{row["runs"]:>6}{row["failures"]:>8}{row["avg_ms"] or 0:>9.0f}{row["max_ms"] or 0:>9}'
+            )
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.outbox import BATCH_SIZE, deliver_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails in batches over one mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Emails per batch (default {BATCH_SIZE})')
+        parser.add_argument('--loop', action='store_true', help='Keep running and poll for new emails')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between polls with --loop (default 2)')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_outbox(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Outbox drained: {total_sent} sent, {total_failed} failed'))
@@ -0,0 +1,34 @@
+import copy
+
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+
+from core.cache import invalidate_tags, reference_cache
+
+
+class ReferenceManager(models.Manager):
+    """
+    Manager for small lookup tables that change rarely (types, locations...).
+
+    ``cached()`` returns every row from the two-tier reference cache; any
+    save or delete of the model expires it for all workers.
+    """
+
+    def contribute_to_class(self, cls, name):
+        super().contribute_to_class(cls, name)
+        if not cls._meta.abstract:
+            uid = f'reference-cache-{cls._meta.label_lower}'
+            post_save.connect(self._expire, sender=cls, weak=False, dispatch_uid=uid)
+            post_delete.connect(self._expire, sender=cls, weak=False, dispatch_uid=f'{uid}-delete')
+
+    @property
+    def cache_tag(self):
+        return f'reference:{self.model._meta.label_lower}'
+
+    def _expire(self, sender, **kwargs):
+        invalidate_tags(self.cache_tag)
+
+    def cached(self):
+        rows = reference_cache.get(self.cache_tag, 'all', lambda: list(self.get_queryset()))
+        # Copies, so callers can annotate rows without touching the shared ones
+        return [copy.copy(row) for row in rows]
@@ -0,0 +1,297 @@
+import io
+import os
+import re
+import tempfile
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+
+# Variants are resized to fit these bounds at most (pixels)
+MAX_VARIANT_SIZE = 4000
+
+# Widths every uploaded image is processed into (never wider than the
+# original), in each of these formats, most efficient first
+VARIANT_WIDTHS = (320, 640, 960, 1280, 1920)
+VARIANT_FORMATS = ('avif', 'webp')
+
+VARIANT_SPEC = re.compile(r'^(\d+)x(\d+)$')
+
+# Originals are never overwritten (new uploads get new names), so their
+# variants can be cached for good
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class MediaImage(str):
+    """
+    An image field value: the stored name, with URLs from the configured
+    media backend. ``variants`` lists the versions made at upload time
+    (dicts of format, width, height and url), when the model keeps them.
+    """
+    variants = ()
+
+    @property
+    def name(self):
+        return str(self)
+
+    @property
+    def url(self):
+        return media_backend().url(self.name)
+
+    def variant_url(self, width, height=None):
+        """URL of the image resized to ``width`` (and cropped to ``height`` if given)."""
+        return media_backend().variant_url(self.name, width, height)
+
+
+def variant_widths(width):
+    """The ladder widths for an original ``width`` pixels wide, without upscaling."""
+    return sorted({min(ladder_width, width) for ladder_width in VARIANT_WIDTHS})
+
+
+class CloudinaryMediaBackend:
+    """Images stored on Cloudinary; variants are Cloudinary transformations."""
+
+    def resource(self, name):
+        from cloudinary import CloudinaryResource
+        from cloudinary.models import CLOUDINARY_FIELD_DB_RE
+
+        # Values saved by CloudinaryField look like "image/upload/v12/id.jpg"
+        match = re.match(CLOUDINARY_FIELD_DB_RE, name)
+        return CloudinaryResource(
+            type=match.group('type') or 'upload',
+            resource_type=match.group('resource_type') or 'image',
+            version=match.group('version'),
+            public_id=match.group('public_id'),
+            format=match.group('format'),
+        )
+
+    def url(self, name):
+        return self.resource(name).url
+
+    def variant_url(self, name, width, height=None):
+        options = {'width': width, 'crop': 'fill' if height else 'limit', 'quality': 'auto', 'fetch_format': 'auto'}
+        if height:
+            options['height'] = height
+        return self.resource(name).build_url(**options)
+
+    def make_variants(self, name):
+        """Have Cloudinary make the variant ladder now (eager transformations) rather than on first view."""
+        import cloudinary.uploader
+
+        resource = self.resource(name)
+        requested = [
+            (format, {'width': width, 'crop': 'limit', 'quality': 'auto', 'format': format})
+            for format in VARIANT_FORMATS for width in VARIANT_WIDTHS
+        ]
+        result = cloudinary.uploader.explicit(
+            resource.public_id, type=resource.type, eager=[transformation for _, transformation in requested],
+        )
+        variants = []
+        for (format, _), eager in zip(requested, result['eager']):
+            # 'limit' never upscales, so widths past the original repeat it
+            if not any(v['format'] == format and v['width'] == eager['width'] for v in variants):
+                variants.append(
+                    {'format': format, 'width': eager['width'], 'height': eager['height'], 'url': eager['secure_url']}
+                )
+        return result['width'], result['height'], variants
+
+    def save(self, name, content):
+        import cloudinary.uploader
+
+        public_id = os.path.splitext(name)[0]
+        return cloudinary.uploader.upload_resource(content, public_id=public_id, resource_type='image').get_prep_value()
+
+    def upload(self, path, public_id):
+        import cloudinary.uploader
+
+        return cloudinary.uploader.upload(path, public_id=public_id, resource_type='image', overwrite=False)['public_id']
+
+
+class VariantCache:
+    """
+    Resized images on disk, bounded to ``max_bytes``. Reads bump a file's
+    mtime; once over the limit the least recently used files are removed
+    down to 90% of it.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = str(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.size = None
+
+    def path(self, spec, name):
+        return os.path.join(self.root, spec, name)
+
+    def get(self, spec, name):
+        path = self.path(spec, name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, spec, name, data):
+        path = self.path(spec, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write aside and rename, so readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self.files())
+            else:
+                self.size += len(data)
+            if self.size > self.max_bytes:
+                self.evict()
+        return path
+
+    def files(self):
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def evict(self):
+        # Other processes share the directory, so recount from disk
+        files = sorted(self.files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.size = total
+
+
+def fit_image(image, width, height=None):
+    """``image`` resized to ``width``, cropped to ``height`` if given."""
+    from PIL import Image, ImageOps
+
+    if height:
+        image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    else:
+        image = image.copy()
+        image.thumbnail((width, MAX_VARIANT_SIZE), Image.LANCZOS)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    return image
+
+
+def encode_image(image, format, quality=80):
+    output = io.BytesIO()
+    image.save(output, format.upper(), quality=quality)
+    return output.getvalue()
+
+
+def resize_image(source, width, height=None, quality=80):
+    """``source`` resized to ``width`` (cropped to ``height`` if given), re-encoded as WebP."""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        return encode_image(fit_image(ImageOps.exif_transpose(image), width, height), 'webp', quality)
+
+
+class LocalMediaBackend:
+    """
+    Images stored under MEDIA_ROOT, for working offline and benchmarking
+    without the CDN. Variants are made with Pillow on first request and
+    kept in a bounded cache (see ``core.views.media_variant``).
+    """
+    content_type = 'image/webp'
+
+    def __init__(self):
+        self.storage = FileSystemStorage(location=settings.MEDIA_ROOT, base_url=settings.MEDIA_URL)
+        self.cache = VariantCache(settings.MEDIA_VARIANT_ROOT, settings.MEDIA_VARIANT_CACHE_SIZE)
+        self.signer = signing.Signer(salt='core.media.variant')
+
+    def url(self, name):
+        return self.storage.url(name)
+
+    def signature(self, spec, name):
+        return self.signer.signature(f'{spec}/{name}')
+
+    def variant_url(self, name, width, height=None):
+        # Signed, so only sizes the templates ask for can be generated
+        spec = f'{int(width)}x{int(height or 0)}'
+        return reverse('media_variant', args=[self.signature(spec, name), spec, name])
+
+    def save(self, name, content):
+        return self.storage.save(name, content)
+
+    def upload(self, path, public_id):
+        name = public_id + os.path.splitext(path)[1].lower()
+        # Names come from the content hash, so an existing file is the same image
+        if self.storage.exists(name):
+            return name
+        with open(path, 'rb') as f:
+            return self.storage.save(name, File(f))
+
+    def make_variants(self, name):
+        """Write the variant ladder next to the original; returns (width, height, variants)."""
+        from PIL import Image, ImageOps, features
+
+        base = os.path.splitext(name)[0]
+        variants = []
+        with Image.open(self.storage.path(name)) as image:
+            image = ImageOps.exif_transpose(image)
+            for format in VARIANT_FORMATS:
+                if not features.check(format):
+                    continue
+                for width in variant_widths(image.width):
+                    variant = fit_image(image, width)
+                    variant_name = f'{base}-{width}w.{format}'
+                    self.storage.delete(variant_name)
+                    self.storage.save(variant_name, ContentFile(encode_image(variant, format)))
+                    variants.append({
+                        'format': format, 'width': variant.width, 'height': variant.height,
+                        'url': self.storage.url(variant_name),
+                    })
+            return image.width, image.height, variants
+
+    def variant(self, signature, spec, name):
+        """Path of the cached variant, generating it if needed; None if the request is not valid."""
+        match = VARIANT_SPEC.match(spec)
+        if not match or not signing.constant_time_compare(signature, self.signature(spec, name)):
+            return None
+        width, height = int(match.group(1)), int(match.group(2))
+        if not 0 < width <= MAX_VARIANT_SIZE or height > MAX_VARIANT_SIZE:
+            return None
+
+        path = self.cache.get(spec, name)
+        if path is None:
+            source = self.storage.path(name)
+            if not os.path.isfile(source):
+                return None
+            path = self.cache.put(spec, name, resize_image(source, width, height))
+        return path
+
+
+@lru_cache(maxsize=None)
+def media_backend():
+    return import_string(settings.MEDIA_BACKEND)()
+
+
+@receiver(setting_changed)
+def reset_media_backend(setting, **kwargs):
+    if setting.startswith('MEDIA_'):
+        media_backend.cache_clear()
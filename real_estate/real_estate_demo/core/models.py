@@ -1,3 +1,76 @@
 from django.db import models
 
-# Create your models here.
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be delivered by the send_outbox worker. Rows are
+    written in the same transaction as whatever triggered them, so an email
+    is queued exactly when its Inquiry or Contact is saved.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            # The worker polls for pending rows that are due
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.to)}'
+
+
+class Job(models.Model):
+    """
+    A queued call of a function registered with ``@job`` (see core.jobs),
+    claimed and run by the run_jobs worker.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField()
+    # Set while queued or running to keep a single copy of a job in the queue
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True, unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            # Workers claim the next queued job that is due
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+            models.Index(fields=['name', '-finished_at'], name='job_name_finished_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.name} ({self.status})'
@@ -0,0 +1,127 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .jobs import enqueue, job
+from .models import OutboxEmail
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+
+# Retries wait 1, 2, 4, ... minutes, capped at an hour; after the last
+# attempt the email is left as failed for someone to look at
+MAX_ATTEMPTS = 8
+RETRY_BASE = timedelta(minutes=1)
+RETRY_MAX = timedelta(hours=1)
+
+# A claimed email is sent again if its worker hasn't recorded the result by then
+SEND_TIMEOUT = timedelta(minutes=10)
+
+
+def queue_email(subject, body, to, from_email=None):
+    """Queue an email for the send_outbox worker. Call it inside the transaction that caused it."""
+    email = OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+        next_attempt_at=timezone.now(),
+    )
+    enqueue(send_outbox, dedupe_key='send-outbox')
+    return email
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+
+
+def _claim(batch_size):
+    """
+    Mark a batch of due emails as sending and return them. Claimed rows are
+    due again after SEND_TIMEOUT, so a worker that dies mid-batch doesn't
+    leave them stuck.
+    """
+    now = timezone.now()
+    lease = now + SEND_TIMEOUT
+    with transaction.atomic():
+        queryset = OutboxEmail.objects.filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+        if db_connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        ids = list(queryset.order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        # Without SKIP LOCKED another worker may have read the same rows;
+        # the lease time marks the ones this update took
+        OutboxEmail.objects.filter(
+            id__in=ids, status__in=['pending', 'sending'], next_attempt_at__lte=now
+        ).update(status='sending', next_attempt_at=lease)
+    return list(OutboxEmail.objects.filter(id__in=ids, status='sending', next_attempt_at=lease).order_by('id'))
+
+
+def _failed(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)[:1000]
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = 'failed'
+        logger.error('Giving up on outbox email %s after %s attempts: %s', email.pk, email.attempts, error)
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def deliver_outbox(batch_size=BATCH_SIZE, connection=None):
+    """
+    Send one batch of due emails over a single mail connection.
+
+    Rows are claimed and their results recorded in two short transactions;
+    nothing is locked while the relay is talked to. Returns ``(sent, failed)``.
+    """
+    sent = failed = 0
+    emails = _claim(batch_size)
+    if not emails:
+        return sent, failed
+
+    now = timezone.now()
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # The relay is unreachable: every email in the batch waits for the next attempt
+        for email in emails:
+            _failed(email, e, now)
+        failed = len(emails)
+    else:
+        try:
+            for email in emails:
+                message = EmailMessage(email.subject, email.body, email.from_email, email.to, connection=connection)
+                try:
+                    message.send()
+                except Exception as e:
+                    _failed(email, e, now)
+                    failed += 1
+                else:
+                    email.attempts += 1
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    sent += 1
+        finally:
+            connection.close()
+
+    with transaction.atomic():
+        OutboxEmail.objects.bulk_update(
+            emails, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return sent, failed
+
+
+@job(every=timedelta(minutes=5))
+def send_outbox():
+    """Deliver every due email; queued after each new email, and periodically for retries."""
+    while any(deliver_outbox()):
+        pass
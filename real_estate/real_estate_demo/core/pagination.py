@@ -0,0 +1,251 @@
+import base64
+import hashlib
+import json
+
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from .cache import get_tagged, set_tagged, tag_versions
+
+
+# Cached counts are dropped when their model's count tag is invalidated; the
+# timeout bounds what writes that bypass signals (queryset.update()) can cost
+COUNT_CACHE_TIMEOUT = 10 * 60
+
+# Unfiltered tables bigger than this are counted from the table statistics
+APPROXIMATE_COUNT_THRESHOLD = 100_000
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def count_tag(model):
+    """Tag invalidated whenever rows of ``model`` are written."""
+    return f'count:{model._meta.label_lower}'
+
+
+def estimated_row_count(model, using='default'):
+    """Row count from the database's table statistics, or None if it keeps none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables never analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator that caches the COUNT(*) of each distinct query until a row of
+    its model is written (see count_tag()).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'count:' + hashlib.md5(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+        count = get_tagged(key)
+        if count is None:
+            versions = tag_versions([count_tag(queryset.model)])
+            count = queryset.count()
+            set_tagged(key, count, versions, COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class ApproximateCountPaginator(CachedCountPaginator):
+    """
+    For unfiltered querysets over big tables, takes the count from the table
+    statistics instead; ``approximate`` tells templates to say "about N".
+    """
+    approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > APPROXIMATE_COUNT_THRESHOLD:
+                self.approximate = True
+                return estimate
+        return super().count
+
+
+def _json_default(value):
+    # Full precision: DjangoJSONEncoder truncates datetimes to milliseconds
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, values], default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset paginator: pages are addressed by the position of their first or
+    last row instead of an OFFSET, and no COUNT(*) is issued, so every page
+    costs the same regardless of how deep it is.
+
+    ``ordering`` must be unique, e.g. ``('-created_at', '-id')``.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def _position(self, obj):
+        return [getattr(obj, name) for name in self.fields]
+
+    def _seek(self, values, forward):
+        """Q object matching rows strictly after (or before) ``values`` in ordering."""
+        condition = Q()
+        for i, name in enumerate(self.ordering):
+            descending = name.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            field = self.fields[i]
+            prefix = {self.fields[j]: values[j] for j in range(i)}
+            condition |= Q(**prefix, **{f'{field}__{lookup}': values[i]})
+        return condition
+
+    def _reverse_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _parse_values(self, values):
+        if len(values) != len(self.fields):
+            raise InvalidCursor(values)
+        model = self.queryset.model
+        try:
+            return [model._meta.get_field(name).to_python(value) for name, value in zip(self.fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(values)
+
+    def page(self, cursor=None):
+        if not cursor:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next, has_previous = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        else:
+            direction, values = decode_cursor(cursor)
+            values = self._parse_values(values)
+            if direction == 'next':
+                queryset = self.queryset.filter(self._seek(values, forward=True)).order_by(*self.ordering)
+                rows = list(queryset[:self.per_page + 1])
+                has_next, has_previous = len(rows) > self.per_page, True
+                rows = rows[:self.per_page]
+            else:
+                queryset = self.queryset.filter(self._seek(values, forward=False)).order_by(*self._reverse_ordering())
+                rows = list(queryset[:self.per_page + 1])
+                has_next, has_previous = True, len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor('next', self._position(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor('prev', self._position(rows[0]))
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+class CursorPaginationMixin:
+    """
+    Keyset pagination for ListViews.
+
+    Requests are paginated by ``?cursor=`` tokens; an explicit ``?page=``
+    keeps using Django's offset paginator so old links still work. Other
+    query parameters (the filters) are preserved in ``pagination_query``.
+    """
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('-created_at', '-id')
+    paginator_class = CachedCountPaginator
+
+    def use_cursor_pagination(self):
+        return self.page_kwarg not in self.request.GET or self.cursor_query_param in self.request.GET
+
+    def get_cursor_paginator(self, queryset, page_size):
+        return CursorPaginator(queryset, page_size, self.cursor_ordering)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = self.get_cursor_paginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        params.pop(self.page_kwarg, None)
+        params.pop(self.cursor_query_param, None)
+        context['pagination_query'] = params.urlencode()
+        context['cursor_pagination'] = isinstance(context.get('paginator'), CursorPaginator)
+        return context
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+
+# Sent with ``tags`` whenever cached pages are expired by invalidate_tags()
+tags_invalidated = Signal()
@@ -0,0 +1,61 @@
+from django import template
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_variant(image, width, height=None):
+    """
+    URL of ``image`` resized for display, e.g. a card background::
+
+        {% image_variant property.get_primary_image 600 400 %}
+
+    Without ``height`` the image is scaled to ``width`` without cropping.
+    """
+    if not image:
+        return ''
+    return image.variant_url(width, height)
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', alt='', css_class='', loading='lazy', fallback_width=640):
+    """
+    A <picture> offering the upload-time variants of ``image`` (see
+    ``MediaImage.variants``) by format and width, so the browser downloads
+    the smallest one that fits ``sizes``::
+
+        {% responsive_image property.get_primary_image sizes="(max-width: 767px) 100vw, 400px" alt=property.title %}
+
+    Images not processed yet get a single resized variant.
+    """
+    if not image:
+        return ''
+    variants = sorted(image.variants, key=lambda variant: variant['width'])
+    if not variants:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            image.variant_url(fallback_width), alt, css_class, loading,
+        )
+
+    sources = []
+    by_format = {}
+    for variant in variants:
+        by_format.setdefault(variant['format'], []).append(variant)
+    for image_format, format_variants in by_format.items():
+        sources.append(format_html(
+            '<source type="image/{}" srcset="{}" sizes="{}">',
+            image_format, ', '.join(f'{variant["url"]} {variant["width"]}w' for variant in format_variants), sizes,
+        ))
+    # The <img> is what browsers without a matching source load, and gives
+    # the aspect ratio before anything arrives
+    fallback_variants = by_format.get('webp') or list(by_format.values())[-1]
+    fallback = next(
+        (variant for variant in fallback_variants if variant['width'] >= fallback_width), fallback_variants[-1]
+    )
+    return format_html(
+        '<picture>{}<img src="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}" decoding="async"></picture>',
+        mark_safe(''.join(sources)), fallback['url'], fallback['width'], fallback['height'], alt, css_class, loading,
+    )
@@ -0,0 +1,49 @@
+from django import template
+
+from core.cache import get_tagged, object_tag, set_tagged, tag_versions
+
+
+register = template.Library()
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, name, obj, tags):
+        self.nodelist = nodelist
+        self.name = name
+        self.obj = obj
+        self.tags = tags
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        obj = self.obj.resolve(context)
+        key = f'fragment:{name}:{obj._meta.label_lower}:{obj.pk}'
+        content = get_tagged(key)
+        if content is None:
+            tags = [object_tag(obj)] + [tag.resolve(context) for tag in self.tags]
+            versions = tag_versions(tags)
+            content = self.nodelist.render(context)
+            set_tagged(key, content, versions)
+        return content
+
+
+@register.tag
+def cachefragment(parser, token):
+    """
+    Cache a block rendered for one object until the object or any of the
+    extra tags is invalidated::
+
+        {% cachefragment 'property-card' property 'locations' %}
+            ...
+        {% endcachefragment %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and an object")
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    return CacheFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
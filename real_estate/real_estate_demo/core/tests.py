@@ -1,3 +1,361 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import OperationalError, connection
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import cache as cache_module
+from .cache import ReferenceCache, cache_metrics, invalidate_tags, single_flight, tag_versions
+from .jobs import claim, enqueue, job, run, schedule_periodic
+from .media import MediaImage, VariantCache, media_backend
+from .models import Job, OutboxEmail
+from .outbox import MAX_ATTEMPTS, SEND_TIMEOUT, deliver_outbox, queue_email
+
+
+class ReferenceCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.reference = ReferenceCache(maxsize=2)
+        self.loads = []
+
+    def load(self, value):
+        def loader():
+            self.loads.append(value)
+            return value
+        return loader
+
+    def test_reuses_local_copy_until_tag_bumped(self):
+        self.assertEqual(self.reference.get('types', 'all', self.load('a')), 'a')
+        self.assertEqual(self.reference.get('types', 'all', self.load('b')), 'a')
+        invalidate_tags('types')
+        self.assertEqual(self.reference.get('types', 'all', self.load('c')), 'c')
+        self.assertEqual(self.loads, ['a', 'c'])
+
+    def test_other_workers_read_the_shared_tier(self):
+        self.reference.get('types', 'all', self.load('a'))
+        other_worker = ReferenceCache()
+        self.assertEqual(other_worker.get('types', 'all', self.load('b')), 'a')
+        self.assertEqual(self.loads, ['a'])
+
+    def test_least_recently_used_entry_evicted(self):
+        for key in ('x', 'y', 'z'):
+            self.reference.get('types', key, self.load(key))
+        self.assertEqual(list(self.reference.entries), [('types', 'y'), ('types', 'z')])
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, value):
+        def compute():
+            self.calls += 1
+            return value, tag_versions(['listings'])
+        return compute
+
+    def fail(self):
+        raise OperationalError('timeout')
+
+    def test_hit_after_first_compute(self):
+        self.assertEqual(single_flight('page', self.compute('a')), 'a')
+        self.assertEqual(single_flight('page', self.compute('b')), 'a')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache_metrics()['miss'], 1)
+        self.assertEqual(cache_metrics()['hit'], 1)
+
+    def test_stale_value_served_while_another_worker_recomputes(self):
+        single_flight('page', self.compute('a'))
+        invalidate_tags('listings')
+        cache.add('page:lock', 1)
+        self.assertEqual(single_flight('page', self.compute('b')), 'a')
+        self.assertEqual(cache_metrics()['stale'], 1)
+
+        cache.delete('page:lock')
+        self.assertEqual(single_flight('page', self.compute('b')), 'b')
+
+    def test_stale_value_served_on_database_error(self):
+        single_flight('page', self.compute('a'))
+        invalidate_tags('listings')
+        self.assertEqual(single_flight('page', self.fail), 'a')
+        self.assertEqual(cache_metrics()['stale_on_error'], 1)
+        self.assertIsNone(cache.get('page:lock'))
+
+        cache.clear()
+        with self.assertRaises(OperationalError):
+            single_flight('page', self.fail)
+
+    def test_waits_for_the_worker_holding_the_lock(self):
+        cache.add('page:lock', 1)
+        sleep = cache_module.time.sleep
+
+        def other_worker_finishes(seconds):
+            cache.set('page', ('a', tag_versions(['listings'])))
+
+        cache_module.time.sleep = other_worker_finishes
+        try:
+            self.assertEqual(single_flight('page', self.compute('b')), 'a')
+        finally:
+            cache_module.time.sleep = sleep
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(cache_metrics()['coalesced'], 1)
+
+
+class CountingBackend(EmailBackend):
+    """Local stand-in for the SMTP relay that counts connections and can fail."""
+
+    def __init__(self, fail_for=(), down=False, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_for = set(fail_for)
+        self.down = down
+        self.opened = 0
+        self.atomic_depths = []
+
+    def open(self):
+        if self.down:
+            raise ConnectionRefusedError('relay down')
+        self.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        self.atomic_depths.append(len(connection.atomic_blocks))
+        for message in messages:
+            if set(message.to) & self.fail_for:
+                raise SMTPServerDisconnected('lost connection')
+        return super().send_messages(messages)
+
+
+class OutboxTests(TestCase):
+    def test_batch_sent_over_one_connection(self):
+        for i in range(3):
+            queue_email(f'Subject {i}', 'Body', [f'user{i}@example.com'])
+        backend = CountingBackend()
+        self.assertEqual(deliver_outbox(connection=backend), (3, 0))
+        self.assertEqual(backend.opened, 1)
+        self.assertEqual([message.subject for message in mail.outbox], ['Subject 0', 'Subject 1', 'Subject 2'])
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+        self.assertEqual(deliver_outbox(connection=CountingBackend()), (0, 0))
+
+    def test_sent_outside_a_transaction(self):
+        queue_email('Subject', 'Body', ['user@example.com'])
+        # The test case itself runs in transactions; sending must add none
+        depth = len(connection.atomic_blocks)
+        backend = CountingBackend()
+        deliver_outbox(connection=backend)
+        self.assertEqual(backend.atomic_depths, [depth])
+
+    def test_abandoned_claim_sent_after_timeout(self):
+        queue_email('Subject', 'Body', ['user@example.com'])
+        OutboxEmail.objects.update(status='sending', next_attempt_at=timezone.now() + SEND_TIMEOUT)
+        self.assertEqual(deliver_outbox(connection=CountingBackend()), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_outbox(connection=CountingBackend()), (1, 0))
+        self.assertEqual(OutboxEmail.objects.get().status, 'sent')
+
+    def test_failed_email_retried_with_backoff(self):
+        queue_email('Bounce', 'Body', ['bad@example.com'])
+        queue_email('Fine', 'Body', ['good@example.com'])
+        self.assertEqual(deliver_outbox(connection=CountingBackend(fail_for=['bad@example.com'])), (1, 1))
+
+        email = OutboxEmail.objects.get(subject='Bounce')
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('lost connection', email.last_error)
+        # Not due yet
+        self.assertEqual(deliver_outbox(connection=CountingBackend()), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_outbox(connection=CountingBackend()), (1, 0))
+
+    def test_gives_up_after_max_attempts(self):
+        queue_email('Subject', 'Body', ['user@example.com'])
+        for _ in range(MAX_ATTEMPTS):
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            deliver_outbox(connection=CountingBackend(down=True))
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('failed', MAX_ATTEMPTS))
+        self.assertIn('relay down', email.last_error)
+
+
+calls = []
+
+
+@job(name='tests.record', max_attempts=2)
+def record(value):
+    if value == 'fail':
+        raise ValueError('bad value')
+    calls.append(value)
+
+
+@job(name='tests.periodic', every=timedelta(hours=1))
+def periodic():
+    calls.append('tick')
+
+
+@job(name='tests.optional', every=timedelta(hours=1), setting='TESTS_OPTIONAL_JOB')
+def optional():
+    calls.append('optional')
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_due(self):
+        while (claimed := claim('test')) is not None:
+            run(claimed)
+
+    def test_delayed_job_run_and_timed(self):
+        record.delay('a')
+        record.schedule(timedelta(hours=1), 'later')
+        self.run_due()
+        self.assertEqual(calls, ['a'])
+        done = Job.objects.get(status='done')
+        self.assertIsNotNone(done.duration_ms)
+        self.assertEqual(Job.objects.get(status='queued').args, ['later'])
+
+    def test_failed_job_retried_then_given_up(self):
+        record.delay('fail')
+        self.run_due()
+        failed = Job.objects.get()
+        self.assertEqual((failed.status, failed.attempts), ('queued', 1))
+        self.assertIn('bad value', failed.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        self.run_due()
+        self.assertEqual(Job.objects.get().status, 'failed')
+
+    def test_dedupe_key_keeps_one_job_waiting(self):
+        self.assertIsNotNone(enqueue(record, ['a'], dedupe_key='record'))
+        self.assertIsNone(enqueue(record, ['b'], dedupe_key='record'))
+        claimed = claim('test')
+        # Once taken, a new one can be queued behind it
+        self.assertIsNotNone(enqueue(record, ['c'], dedupe_key='record'))
+        run(claimed)
+        self.assertEqual(calls, ['a'])
+
+    def test_periodic_job_queues_its_next_run(self):
+        enqueue(periodic, dedupe_key='periodic:tests.periodic')
+        self.run_due()
+        self.assertEqual(calls, ['tick'])
+        following = Job.objects.get(status='queued')
+        self.assertGreater(following.run_at, timezone.now() + timedelta(minutes=59))
+
+    def test_periodic_job_behind_a_setting_scheduled_only_when_on(self):
+        schedule_periodic()
+        self.assertFalse(Job.objects.filter(name='tests.optional').exists())
+        with self.settings(TESTS_OPTIONAL_JOB=True):
+            schedule_periodic()
+            self.run_due()
+        self.assertIn('optional', calls)
+        self.assertTrue(Job.objects.filter(name='tests.optional', status='queued').exists())
+
+        # Turned off, a run already queued doesn't queue another
+        Job.objects.filter(name='tests.optional').update(run_at=timezone.now())
+        self.run_due()
+        self.assertFalse(Job.objects.filter(name='tests.optional', status='queued').exists())
+
+
+def image_file(width, height):
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), 'navy').save(output, 'JPEG')
+    return ContentFile(output.getvalue())
+
+
+class LocalMediaTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        variant_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.addCleanup(variant_root.cleanup)
+        settings = override_settings(
+            MEDIA_BACKEND='core.media.LocalMediaBackend',
+            MEDIA_ROOT=media_root.name,
+            MEDIA_VARIANT_ROOT=variant_root.name,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.image = MediaImage(media_backend().save('properties/house.jpg', image_file(800, 600)))
+
+    def test_variant_generated_once_and_cached(self):
+        from PIL import Image
+
+        url = self.image.variant_url(300, 200)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(Image.open(io.BytesIO(b''.join(response.streaming_content))).size, (300, 200))
+
+        path = media_backend().cache.get('300x200', self.image.name)
+        os.utime(path, (0, 0))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # Served from the cache, which marks it as recently used
+        self.assertGreater(os.path.getmtime(path), 0)
+
+    def test_only_signed_sizes_served(self):
+        url = self.image.variant_url(300, 200)
+        self.assertEqual(self.client.get(url.replace('300x200', '3000x2000')).status_code, 404)
+        self.assertEqual(self.client.get(url.replace('house.jpg', 'other.jpg')).status_code, 404)
+
+    def test_original_served(self):
+        response = self.client.get(self.image.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+
+class VariantCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = VariantCache(directory.name, max_bytes=250)
+
+    def test_least_recently_used_evicted(self):
+        for mtime, name in enumerate(['a', 'b']):
+            os.utime(self.cache.put('100x0', name, b'x' * 100), (mtime, mtime))
+        # Reading "a" makes "b" the least recently used
+        self.cache.get('100x0', 'a')
+        self.cache.put('100x0', 'c', b'x' * 100)
+        self.assertIsNone(self.cache.get('100x0', 'b'))
+        self.assertIsNotNone(self.cache.get('100x0', 'a'))
+        self.assertIsNotNone(self.cache.get('100x0', 'c'))
+
+
+class CloudinaryMediaTests(SimpleTestCase):
+    def test_variants_are_url_transformations(self):
+        url = MediaImage('image/upload/v12/truster/properties/house.jpg').variant_url(600, 400)
+        self.assertIn('c_fill,f_auto,h_400,q_auto,w_600', url)
+        self.assertIn('truster/properties/house', url)
+
+
+class ResponsiveImageTagTests(SimpleTestCase):
+    template = Template('{% load media %}{% responsive_image image sizes="50vw" alt="House" %}')
+
+    def test_srcset_per_format(self):
+        image = MediaImage('truster/properties/house')
+        image.variants = [
+            {'format': image_format, 'width': width, 'height': width // 2, 'url': f'/{width}.{image_format}'}
+            for image_format in ('avif', 'webp') for width in (640, 320)
+        ]
+        html = self.template.render(Context({'image': image}))
+        self.assertIn('<source type="image/avif" srcset="/320.avif 320w, /640.avif 640w" sizes="50vw">', html)
+        self.assertIn('<source type="image/webp" srcset="/320.webp 320w, /640.webp 640w" sizes="50vw">', html)
+        self.assertIn('<img src="/640.webp" width="640" height="320" alt="House"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_unprocessed_image_gets_one_resized_variant(self):
+        html = self.template.render(Context({'image': MediaImage('truster/properties/house')}))
+        self.assertNotIn('<source', html)
+        self.assertIn('w_640', html)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+
+urlpatterns = [
+    path('variants/<str:signature>/<str:spec>/<path:name>', views.media_variant, name='media_variant'),
+    path('<path:name>', views.media_original, name='media_original'),
+]
@@ -1,3 +1,35 @@
-from django.shortcuts import render
+import os
 
-# Create your views here.
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.views.static import serve
+
+from .media import IMMUTABLE_CACHE_CONTROL, LocalMediaBackend, media_backend
+
+
+def media_original(request, name):
+    """Uploaded originals, when the local media backend keeps them."""
+    backend = media_backend()
+    if not isinstance(backend, LocalMediaBackend):
+        if settings.DEBUG:
+            return serve(request, name, document_root=settings.MEDIA_ROOT)
+        raise Http404
+    path = backend.storage.path(name)
+    if not os.path.isfile(path):
+        raise Http404
+    response = FileResponse(open(path, 'rb'))
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def media_variant(request, signature, spec, name):
+    """A resized image, generated on first request and then served from the variant cache."""
+    backend = media_backend()
+    if not isinstance(backend, LocalMediaBackend):
+        raise Http404
+    path = backend.variant(signature, spec, name)
+    if path is None:
+        raise Http404
+    response = FileResponse(open(path, 'rb'), content_type=backend.content_type)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
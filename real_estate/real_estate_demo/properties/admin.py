@@ -1,4 +1,5 @@
 from django.contrib import admin
+from core.pagination import ApproximateCountPaginator
 from .models import PropertyType, Location, Agent, PropertyFeature, Property, PropertyImage, Inquiry, Testimonial, Favorite, Contact
 
 
@@ -19,6 +20,7 @@ class LocationAdmin(admin.ModelAdmin):
     list_display = ['name', 'parent', 'latitude', 'longitude']
     list_filter = ['parent']
     prepopulated_fields = {'slug': ('name',)}
+    list_select_related = ['parent']
 
 
 @admin.register(Agent)
@@ -31,7 +33,7 @@ class AgentAdmin(admin.ModelAdmin):
 
 @admin.register(PropertyFeature)
 class PropertyFeatureAdmin(admin.ModelAdmin):
-    list_display = ['name', 'icon']
+    list_display = ['name', 'icon', 'bit']
 
 
 @admin.register(Property)
@@ -40,6 +42,8 @@ class PropertyAdmin(admin.ModelAdmin):
     list_filter = ['property_type', 'status', 'listing_type', 'is_featured', 'is_published', 'created_at']
     search_fields = ['title', 'description', 'address']
     prepopulated_fields = {'slug': ('title',)}
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
     inlines = [PropertyImageInline]
     filter_horizontal = ['features']
     
@@ -74,6 +78,8 @@ class InquiryAdmin(admin.ModelAdmin):
     list_filter = ['inquiry_type', 'status', 'created_at']
     search_fields = ['name', 'email', 'property__title']
     readonly_fields = ['created_at', 'updated_at']
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Testimonial)
@@ -81,6 +87,8 @@ class TestimonialAdmin(admin.ModelAdmin):
     list_display = ['name', 'rating', 'agent', 'is_featured', 'created_at']
     list_filter = ['rating', 'is_featured', 'created_at']
     search_fields = ['name', 'content']
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
@@ -88,6 +96,8 @@ class FavoriteAdmin(admin.ModelAdmin):
     list_display = ['user', 'property', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__username', 'property__title']
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Contact)
@@ -96,6 +106,8 @@ class ContactAdmin(admin.ModelAdmin):
     list_filter = ['inquiry_type', 'status', 'created_at']
     search_fields = ['name', 'email', 'subject', 'message']
     readonly_fields = ['created_at', 'updated_at']
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Contact Information', {
@@ -0,0 +1,96 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Location
+
+
+VERSION_KEY = 'autocomplete:version'
+
+# Listing counts are refreshed at least this often even without Location changes
+MAX_AGE = 10 * 60
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def invalidate_autocomplete():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+class LocationAutocomplete:
+    """
+    Sorted-array prefix index over location names, loaded once per worker.
+
+    Every location is reachable by its own name ("mirpur") and by its full
+    label ("mirpur, dhaka"), so lookups are a binary search followed by a
+    short scan of the matching range. Counts include the areas below a
+    location, matching what the listing filter returns for it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (keys, entries), replaced whole by load() so readers never pair
+        # the keys of one load with the entries of another
+        self.index = ((), ())
+        self.version = None
+        self.loaded_at = None
+
+    def load(self):
+        locations = list(Location.objects.annotate(
+            listing_count=Count('property', filter=Q(property__is_published=True))
+        ))
+        counts = Counter()
+        for location in locations:
+            for location_id in location.path.split('/')[:-1]:
+                counts[location_id] += location.listing_count
+
+        index = []
+        for location in locations:
+            entry = {
+                'name': location.name,
+                'label': str(location),
+                'slug': location.slug,
+                'count': counts[str(location.pk)],
+            }
+            for key in {normalize(location.name), normalize(entry['label'])}:
+                index.append((key, entry))
+        index.sort(key=lambda item: item[0])
+
+        self.index = (tuple(key for key, _ in index), tuple(entry for _, entry in index))
+
+    def refresh(self):
+        version = cache.get(VERSION_KEY)
+        if self.loaded_at is not None and self.version == version and time.monotonic() - self.loaded_at < MAX_AGE:
+            return
+        with self.lock:
+            self.load()
+            self.version = version
+            self.loaded_at = time.monotonic()
+
+    def complete(self, query, limit=8):
+        """Locations whose name or label starts with ``query``, most listings first."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.refresh()
+
+        keys, entries = self.index
+        matches = {}
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            entry = entries[i]
+            matches[entry['slug'], entry['label']] = entry
+            i += 1
+        return sorted(matches.values(), key=lambda entry: (-entry['count'], entry['label']))[:limit]
+
+
+location_autocomplete = LocationAutocomplete()
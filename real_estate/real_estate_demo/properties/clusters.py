@@ -0,0 +1,126 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Max, Min, Q, Sum
+from django.db.models.functions import Cast, Greatest, Least, Substr
+
+from .geo import cover_bbox
+from .models import Property, PropertyCluster
+
+
+# Geohash precisions clusters are maintained for (1 = ~5000km cells, 7 = ~150m)
+CLUSTER_PRECISIONS = range(1, 8)
+
+# Map zoom level (web mercator, 0-20) -> cluster precision
+ZOOM_PRECISION = [1, 1, 1, 2, 2, 3, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7]
+
+
+def precision_for_zoom(zoom):
+    return ZOOM_PRECISION[max(0, min(zoom, len(ZOOM_PRECISION) - 1))]
+
+
+def cluster_state(property_obj):
+    """The part of a property the clusters depend on, or None if it is not on the map."""
+    if not property_obj.is_published or not property_obj.geohash:
+        return None
+    return {
+        'geohash': property_obj.geohash,
+        'latitude': float(property_obj.latitude),
+        'longitude': float(property_obj.longitude),
+        'price': Decimal(str(property_obj.price)),
+    }
+
+
+def _add(state):
+    for precision in CLUSTER_PRECISIONS:
+        cell = state['geohash'][:precision]
+        updates = {
+            'count': F('count') + 1,
+            'latitude_sum': F('latitude_sum') + state['latitude'],
+            'longitude_sum': F('longitude_sum') + state['longitude'],
+            'min_price': Least(F('min_price'), state['price']),
+            'max_price': Greatest(F('max_price'), state['price']),
+        }
+        if PropertyCluster.objects.filter(precision=precision, cell=cell).update(**updates):
+            continue
+        try:
+            with transaction.atomic():
+                PropertyCluster.objects.create(
+                    precision=precision, cell=cell, count=1,
+                    latitude_sum=state['latitude'], longitude_sum=state['longitude'],
+                    min_price=state['price'], max_price=state['price'],
+                )
+        except IntegrityError:
+            # Another request created the cell first
+            PropertyCluster.objects.filter(precision=precision, cell=cell).update(**updates)
+
+
+def _remove(state):
+    for precision in CLUSTER_PRECISIONS:
+        cell = state['geohash'][:precision]
+        PropertyCluster.objects.filter(precision=precision, cell=cell).update(
+            count=F('count') - 1,
+            latitude_sum=F('latitude_sum') - state['latitude'],
+            longitude_sum=F('longitude_sum') - state['longitude'],
+        )
+        cluster = PropertyCluster.objects.filter(precision=precision, cell=cell).first()
+        if cluster is None:
+            continue
+        if cluster.count <= 0:
+            cluster.delete()
+        elif state['price'] in (cluster.min_price, cluster.max_price):
+            # The removed listing may have been the cheapest or dearest one
+            prices = Property.objects.filter(
+                is_published=True, geohash__startswith=cell,
+            ).aggregate(min_price=Min('price'), max_price=Max('price'))
+            if prices['min_price'] is not None:
+                PropertyCluster.objects.filter(pk=cluster.pk).update(**prices)
+
+
+def update_clusters(old_state, new_state):
+    """Apply the change of one property from ``old_state`` to ``new_state``."""
+    if old_state == new_state:
+        return
+    with transaction.atomic():
+        if old_state:
+            _remove(old_state)
+        if new_state:
+            _add(new_state)
+
+
+def rebuild_clusters():
+    """Recompute every cluster from the property table."""
+    published = Property.objects.filter(is_published=True).exclude(geohash='')
+    with transaction.atomic():
+        PropertyCluster.objects.all().delete()
+        for precision in CLUSTER_PRECISIONS:
+            rows = (
+                published
+                .annotate(cell=Substr('geohash', 1, precision))
+                .values('cell')
+                .annotate(
+                    count=Count('id'),
+                    latitude_sum=Sum(Cast('latitude', FloatField())),
+                    longitude_sum=Sum(Cast('longitude', FloatField())),
+                    min_price=Min('price'),
+                    max_price=Max('price'),
+                )
+                .order_by()
+            )
+            PropertyCluster.objects.bulk_create(
+                [PropertyCluster(precision=precision, **row) for row in rows],
+                batch_size=1000,
+            )
+
+
+def clusters_in_bbox(south, west, north, east, zoom):
+    precision = precision_for_zoom(zoom)
+    prefixes = Q()
+    for cell in {cell[:precision] for cell in cover_bbox(south, west, north, east)}:
+        prefixes |= Q(cell__startswith=cell)
+
+    clusters = PropertyCluster.objects.filter(prefixes, precision=precision, count__gt=0)
+    return [
+        cluster for cluster in clusters
+        if south <= cluster.latitude <= north and west <= cluster.longitude <= east
+    ]
@@ -0,0 +1,123 @@
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+
+from .models import Property
+
+
+# Rows whose updated_at is this close to the last sync are fetched again, so a
+# transaction that committed late is not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def invalidate_columns(version_key, epoch_key, full=False):
+    """Tell every worker its copy is stale; ``full`` forces a reload (after deletes)."""
+    key = epoch_key if full else version_key
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def empty_column(spec, count):
+    # A column is a dtype, or (dtype, width) for one with several values per row
+    dtype, width = spec if isinstance(spec, tuple) else (spec, None)
+    return np.zeros(count if width is None else (count, width), dtype=dtype)
+
+
+class ColumnState:
+    """
+    One consistent version of per-listing NumPy columns. Writers build a new
+    state with ``with_rows()`` and publish it with a single assignment;
+    readers take the state once, so they never see columns of different
+    lengths.
+
+    Subclasses list their ``COLUMNS`` (which must include ``ids``), fill one
+    row in ``set_row()`` and derive anything else in ``finish()``.
+    """
+    COLUMNS = {'ids': np.int64}
+
+    def __init__(self):
+        self.positions = {}
+        for name, spec in self.COLUMNS.items():
+            setattr(self, name, empty_column(spec, 0))
+
+    @property
+    def nbytes(self):
+        """Size of the columns; the id -> position dict comes on top."""
+        return sum(getattr(self, name).nbytes for name in self.COLUMNS)
+
+    def set_row(self, i, row):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+    def with_rows(self, rows):
+        """A copy of this state with ``rows`` added or updated."""
+        state = type(self)()
+        state.positions = dict(self.positions)
+        new_ids = [row['id'] for row in rows if row['id'] not in state.positions]
+        start = len(self.ids)
+        for name, spec in self.COLUMNS.items():
+            setattr(state, name, np.concatenate([getattr(self, name), empty_column(spec, len(new_ids))]))
+        for offset, pk in enumerate(new_ids):
+            state.ids[start + offset] = pk
+            state.positions[pk] = start + offset
+
+        for row in rows:
+            state.set_row(state.positions[row['id']], row)
+        state.finish()
+        return state
+
+
+class SyncedColumns:
+    """
+    Columns of the published listings, kept by each worker. When another
+    process signals a change through the cache, only the rows whose
+    ``updated_at`` moved since the last sync are read again; deletes bump
+    the epoch instead and force a full reload.
+
+    Subclasses set ``state_class``, the ``fields`` rows are read with and
+    the cache keys.
+    """
+    state_class = ColumnState
+    fields = ('id', 'updated_at')
+    version_key = epoch_key = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.epoch = None
+        self.version = None
+        self.synced_at = None
+        self.state = self.state_class()
+
+    def _upsert(self, rows, state):
+        if not rows:
+            self.state = state
+            return
+        # Readers keep using the old state until this single assignment
+        self.state = state.with_rows(rows)
+
+        latest = max(row['updated_at'] for row in rows)
+        if self.synced_at is None or latest > self.synced_at:
+            self.synced_at = latest
+
+    def rebuild(self):
+        self.synced_at = None
+        self._upsert(list(Property.objects.filter(is_published=True).values(*self.fields)), self.state_class())
+
+    def refresh(self):
+        """Bring the columns up to date with the database if another process changed it."""
+        epoch, version = cache.get(self.epoch_key), cache.get(self.version_key)
+        if self.epoch == epoch and self.version == version and self.synced_at is not None:
+            return
+        with self.lock:
+            if self.epoch != epoch or self.synced_at is None:
+                self.rebuild()
+            elif self.version != version:
+                changed = Property.objects.filter(updated_at__gte=self.synced_at - SYNC_OVERLAP)
+                self._upsert(list(changed.values(*self.fields)), self.state)
+            self.epoch, self.version = epoch, version
@@ -0,0 +1,136 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Value, When
+
+from .features import features_mask, matches_mask
+from .filters import BEDROOM_BUCKETS, PRICE_BUCKETS, apply_filters, bucket_q, filter_signature, location_paths
+from .models import Property
+
+
+FACET_CACHE_TIMEOUT = 60 * 60
+FACET_VERSION_KEY = 'facets:version'
+
+# Facet name -> column of the grouped rows it is read from
+FACETS = {
+    'type': 'property_type__slug',
+    'location': 'location__path',
+    'listing_type': 'listing_type',
+    'bedrooms': 'bedroom_bucket',
+    'price': 'price_bucket',
+}
+
+
+def _bucket_case(field, buckets):
+    return Case(
+        *[When(bucket_q(field, low, high), then=Value(value)) for value, _, low, high in buckets],
+        default=Value(''),
+        output_field=CharField(),
+    )
+
+
+def _facet_version():
+    return cache.get_or_set(FACET_VERSION_KEY, 1, None)
+
+
+def invalidate_facets():
+    try:
+        cache.incr(FACET_VERSION_KEY)
+    except ValueError:
+        cache.set(FACET_VERSION_KEY, 1, None)
+
+
+def compute_facets(filters):
+    """
+    Count listings per facet value in one grouped query.
+
+    Each facet is counted with every other active filter applied but not its
+    own, so the sidebar shows what choosing another value would return. The
+    price range is applied in SQL; the rest is rolled up in Python from the
+    grouped rows, location counts up through the hierarchy.
+    """
+    queryset = apply_filters(
+        Property.objects.filter(is_published=True), filters,
+        exclude=('type', 'location', 'listing_type', 'bedrooms', 'features'),
+    )
+    rows = list(
+        queryset
+        .annotate(
+            bedroom_bucket=_bucket_case('bedrooms', BEDROOM_BUCKETS),
+            price_bucket=_bucket_case('price', PRICE_BUCKETS),
+        )
+        .values(*FACETS.values(), 'feature_mask')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+
+    selected = {
+        column: filters[name]
+        for name, column in FACETS.items()
+        if name in filters and name != 'location'
+    }
+    selected_paths = tuple(location_paths(filters['location'])) if 'location' in filters else None
+    # Features without a bit (beyond the 63rd) are not reflected in the counts
+    selected_mask = features_mask(filters['features'])[0] if 'features' in filters else 0
+    feature_mode = filters.get('features_mode', 'all')
+    counts = {name: Counter() for name in FACETS}
+    feature_counts = Counter()
+    total = 0
+    for row in rows:
+        mismatched = [column for column, value in selected.items() if row[column] != value]
+        if selected_paths is not None and not (row['location__path'] or '').startswith(selected_paths):
+            mismatched.append('location__path')
+        if selected_mask and not matches_mask(row['feature_mask'], selected_mask, feature_mode):
+            mismatched.append('feature_mask')
+        if not mismatched:
+            total += row['count']
+        for name, column in FACETS.items():
+            # A row counts towards a facet if the only filter it fails is that facet's own
+            if not mismatched or mismatched == [column]:
+                counts[name][row[column]] += row['count']
+        # "all" narrows with every feature ticked, "any" widens, so only the
+        # latter ignores its own selection
+        if not mismatched or (feature_mode == 'any' and mismatched == ['feature_mask']):
+            mask = row['feature_mask']
+            while mask:
+                bit = (mask & -mask).bit_length() - 1
+                feature_counts[bit] += row['count']
+                mask &= mask - 1
+
+    return {
+        'total': total,
+        'type': dict(counts['type']),
+        'location': _location_counts(counts['location']),
+        'features': dict(feature_counts),
+        'listing_type': [
+            {'value': value, 'label': label, 'count': counts['listing_type'][value]}
+            for value, label in Property.LISTING_TYPE_CHOICES
+        ],
+        'bedrooms': [
+            {'value': value, 'label': label, 'count': counts['bedrooms'][value]}
+            for value, label, _, _ in BEDROOM_BUCKETS
+        ],
+        'price': [
+            {'value': value, 'label': label, 'count': counts['price'][value], 'min': low, 'max': high}
+            for value, label, low, high in PRICE_BUCKETS
+        ],
+    }
+
+
+def _location_counts(path_counts):
+    """Roll listing counts per location path up to every ancestor, keyed by location id."""
+    counts = Counter()
+    for path, count in path_counts.items():
+        for location_id in (path or '').split('/')[:-1]:
+            counts[int(location_id)] += count
+    return dict(counts)
+
+
+def get_facets(filters):
+    """Facet counts for a filter set, cached per normalized filter signature."""
+    key = f'facets:{_facet_version()}:{filter_signature(filters)}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(filters)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
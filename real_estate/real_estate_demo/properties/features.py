@@ -0,0 +1,87 @@
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Property, PropertyFeature
+
+
+def features_mask(feature_ids):
+    """
+    Combined bit mask of the given features.
+
+    Returns ``(mask, unmapped)`` where ``unmapped`` are the ids of features
+    that exist but have no bit (beyond FEATURE_MASK_BITS) and so must be
+    matched through the M2M table instead.
+    """
+    mask = 0
+    unmapped = []
+    feature_ids = set(feature_ids)
+    for feature in PropertyFeature.objects.cached():
+        if feature.pk not in feature_ids:
+            continue
+        if feature.bit is None:
+            unmapped.append(feature.pk)
+        else:
+            mask |= 1 << feature.bit
+    return mask, unmapped
+
+
+def matches_mask(value, mask, mode):
+    """In-memory counterpart of filter_features(), for an int or a NumPy array of masks."""
+    if mode == 'any':
+        return value & mask != 0
+    return value & mask == mask
+
+
+def filter_features(queryset, feature_ids, mode='all'):
+    """Listings with all (or any) of the features, as one bitwise predicate."""
+    mask, unmapped = features_mask(feature_ids)
+    if mode == 'all' and len(unmapped) + bin(mask).count('1') < len(set(feature_ids)):
+        # A feature that does not exist can never be matched
+        return queryset.none()
+
+    queryset = queryset.alias(feature_match=F('feature_mask').bitand(mask))
+    if mode == 'any':
+        matched = Q(feature_match__gt=0) if mask else Q(pk__in=[])
+        if unmapped:
+            matched |= Q(pk__in=Property.features.through.objects.filter(
+                propertyfeature_id__in=unmapped,
+            ).values('property_id'))
+        return queryset.filter(matched)
+
+    if mask:
+        queryset = queryset.filter(feature_match=mask)
+    for feature_id in unmapped:
+        queryset = queryset.filter(features=feature_id)
+    return queryset
+
+
+def refresh_feature_masks(property_ids):
+    """Recompute feature_mask from the M2M table for the given listings."""
+    property_ids = set(property_ids)
+    if not property_ids:
+        return {}
+
+    masks = dict.fromkeys(property_ids, 0)
+    through = Property.features.through
+    rows = through.objects.filter(
+        property_id__in=property_ids, propertyfeature__bit__isnull=False,
+    ).values_list('property_id', 'propertyfeature__bit')
+    for property_id, bit in rows:
+        masks[property_id] |= 1 << bit
+
+    # Touch updated_at too, so in-memory indexes pick the change up with their next delta
+    now = timezone.now()
+    by_mask = {}
+    for property_id, mask in masks.items():
+        by_mask.setdefault(mask, []).append(property_id)
+    for mask, ids in by_mask.items():
+        Property.objects.filter(pk__in=ids).update(feature_mask=mask, updated_at=now)
+    return masks
+
+
+def clear_feature_bit(bit):
+    """Drop a deleted feature's bit from every listing that had it."""
+    Property.objects.alias(has_bit=F('feature_mask').bitand(1 << bit)).filter(has_bit__gt=0).update(
+        feature_mask=F('feature_mask').bitand(~(1 << bit)),
+        updated_at=timezone.now(),
+    )
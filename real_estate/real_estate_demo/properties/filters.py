@@ -0,0 +1,165 @@
+import hashlib
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
+from django.db.models import Q
+
+from .features import filter_features
+from .geo import parse_bbox, within_bbox, within_radius
+from .models import Location
+
+
+FILTER_PARAMS = (
+    'type', 'location', 'listing_type', 'bedrooms', 'min_price', 'max_price',
+    'bbox', 'lat', 'lng', 'radius',
+)
+
+# Largest radius search accepted, in km
+MAX_RADIUS_KM = 500
+
+# (value, label, min, max) - bounds are inclusive, None means open ended
+BEDROOM_BUCKETS = [
+    ('1', '1 Bed', 1, 1),
+    ('2', '2 Beds', 2, 2),
+    ('3', '3 Beds', 3, 3),
+    ('4', '4 Beds', 4, 4),
+    ('5+', '5+ Beds', 5, None),
+]
+
+PRICE_BUCKETS = [
+    ('0-100000', 'Under $100k', None, Decimal('99999.99')),
+    ('100000-250000', '$100k - $250k', Decimal('100000'), Decimal('249999.99')),
+    ('250000-500000', '$250k - $500k', Decimal('250000'), Decimal('499999.99')),
+    ('500000-1000000', '$500k - $1M', Decimal('500000'), Decimal('999999.99')),
+    ('1000000+', '$1M+', Decimal('1000000'), None),
+]
+
+
+def _parse_price(value):
+    try:
+        price = Decimal(value)
+    except (InvalidOperation, TypeError):
+        return None
+    return price if price.is_finite() and price >= 0 else None
+
+
+def get_filters(params):
+    """Normalize the listing filters found in a QueryDict."""
+    filters = {}
+    for name in FILTER_PARAMS:
+        value = (params.get(name) or '').strip()
+        if value:
+            filters[name] = value
+
+    # The home page search sends a single "low-high" or "low+" price range
+    price_range = (params.get('price_range') or '').strip()
+    if price_range and 'min_price' not in filters and 'max_price' not in filters:
+        low, _, high = price_range.rstrip('+').partition('-')
+        if low:
+            filters['min_price'] = low
+        if high:
+            filters['max_price'] = high
+
+    for name in ('min_price', 'max_price'):
+        if name in filters:
+            price = _parse_price(filters[name])
+            if price is None:
+                del filters[name]
+            else:
+                filters[name] = price
+
+    # Features come from repeated checkboxes or a comma separated list of ids
+    values = params.getlist('features') if hasattr(params, 'getlist') else [params.get('features') or '']
+    feature_ids = {part.strip() for value in values for part in value.split(',')}
+    feature_ids = tuple(sorted(int(part) for part in feature_ids if part.isdigit()))
+    if feature_ids:
+        filters['features'] = feature_ids
+        # "all" is the default and left out so both spellings share a cache key
+        if params.get('features_mode') == 'any':
+            filters['features_mode'] = 'any'
+
+    if filters.get('bedrooms') not in {bucket[0] for bucket in BEDROOM_BUCKETS}:
+        filters.pop('bedrooms', None)
+
+    if 'bbox' in filters:
+        bbox = parse_bbox(filters['bbox'])
+        if bbox is None:
+            del filters['bbox']
+        else:
+            filters['bbox'] = bbox
+
+    # A radius search needs all three of lat, lng and radius
+    geo = {name: filters.pop(name) for name in ('lat', 'lng', 'radius') if name in filters}
+    try:
+        lat, lng, radius = float(geo['lat']), float(geo['lng']), float(geo['radius'])
+    except (KeyError, ValueError):
+        pass
+    else:
+        if -90 <= lat <= 90 and -180 <= lng <= 180 and 0 < radius <= MAX_RADIUS_KM:
+            filters.update(lat=lat, lng=lng, radius=radius)
+    return filters
+
+
+def filter_signature(filters):
+    """Stable hash of a normalized filter set, for use in cache keys."""
+    return hashlib.md5(urlencode(sorted((k, str(v)) for k, v in filters.items())).encode()).hexdigest()
+
+
+def bucket_q(field, low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        q &= Q(**{f'{field}__lte': high})
+    return q
+
+
+def _location_label(text):
+    return ', '.join(' '.join(part.split()) for part in text.split(',')).casefold()
+
+
+def location_paths(value):
+    """
+    Materialized paths of the locations a search means: those with the slug
+    (slugs repeat across cities), or else those whose name or full name is
+    the typed text, for searches sent without picking a suggestion.
+    """
+    locations = Location.objects.cached()
+    paths = [location.path for location in locations if location.slug == value]
+    if not paths:
+        label = _location_label(value)
+        paths = [
+            location.path for location in locations
+            if label in (_location_label(location.name), _location_label(location.full_name))
+        ]
+    return paths
+
+
+def apply_filters(queryset, filters, exclude=()):
+    """Apply normalized filters to a Property queryset, skipping names in ``exclude``."""
+    active = {name: value for name, value in filters.items() if name not in exclude}
+
+    if 'type' in active:
+        queryset = queryset.filter(property_type__slug=active['type'])
+    if 'location' in active:
+        # A location matches every listing in it or in any area below it
+        subtree = Q(pk__in=[])
+        for path in location_paths(active['location']):
+            subtree |= Q(location__path__startswith=path)
+        queryset = queryset.filter(subtree)
+    if 'listing_type' in active:
+        queryset = queryset.filter(listing_type=active['listing_type'])
+    if 'bedrooms' in active:
+        _, _, low, high = next(b for b in BEDROOM_BUCKETS if b[0] == active['bedrooms'])
+        queryset = queryset.filter(bucket_q('bedrooms', low, high))
+    if 'min_price' in active:
+        queryset = queryset.filter(price__gte=active['min_price'])
+    if 'max_price' in active:
+        queryset = queryset.filter(price__lte=active['max_price'])
+    if 'features' in active:
+        queryset = filter_features(queryset, active['features'], filters.get('features_mode', 'all'))
+    if 'bbox' in active:
+        queryset = within_bbox(queryset, *active['bbox'])
+    if 'radius' in active:
+        queryset = within_radius(queryset, active['lat'], active['lng'], active['radius'])
+    return queryset
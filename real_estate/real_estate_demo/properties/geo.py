@@ -0,0 +1,129 @@
+import math
+
+from django.db.models import FloatField, Q
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+GEOHASH_PRECISION = 9
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Upper bound on the number of geohash prefixes used to cover a box
+MAX_COVER_CELLS = 32
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value_range, value = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell."""
+    lat_bits = (5 * precision) // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def cover_bbox(south, west, north, east, max_cells=MAX_COVER_CELLS):
+    """
+    Geohash prefixes whose cells together cover the bounding box.
+
+    Picks the finest precision that needs at most ``max_cells`` cells, so the
+    prefilter is a handful of indexed prefix ranges.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(north / height) - math.floor(south / height) + 1
+        cols = math.floor(east / width) - math.floor(west / width) + 1
+        if rows * cols <= max_cells:
+            break
+
+    cells = set()
+    lat = math.floor(south / height) * height + height / 2
+    while lat - height / 2 <= north:
+        lng = math.floor(west / width) * width + width / 2
+        while lng - width / 2 <= east:
+            cells.add(encode_geohash(max(min(lat, 90), -90), max(min(lng, 180), -180), precision))
+            lng += width
+        lat += height
+    return sorted(cells)
+
+
+def bbox_around(latitude, longitude, radius_km):
+    """Bounding box (south, west, north, east) of a circle."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lng_delta = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180)
+    return (
+        max(latitude - lat_delta, -90), max(longitude - lng_delta, -180),
+        min(latitude + lat_delta, 90), min(longitude + lng_delta, 180),
+    )
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def distance_expression(latitude, longitude):
+    """Haversine distance in km from a point to each row, as a database expression."""
+    lat = Radians(Cast('latitude', FloatField()))
+    lng = Radians(Cast('longitude', FloatField()))
+    origin_lat = math.radians(latitude)
+    origin_lng = math.radians(longitude)
+    a = (
+        Power(Sin((lat - origin_lat) / 2), 2)
+        + math.cos(origin_lat) * Cos(lat) * Power(Sin((lng - origin_lng) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a), output_field=FloatField())
+
+
+def within_bbox(queryset, south, west, north, east):
+    """Filter a queryset to rows inside a bounding box, prefiltered by geohash prefix."""
+    prefixes = Q()
+    for cell in cover_bbox(south, west, north, east):
+        prefixes |= Q(geohash__startswith=cell)
+    return queryset.filter(prefixes).filter(
+        latitude__gte=south, latitude__lte=north,
+        longitude__gte=west, longitude__lte=east,
+    )
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """Filter to rows within ``radius_km`` and annotate their ``distance``."""
+    queryset = within_bbox(queryset, *bbox_around(latitude, longitude, radius_km))
+    return queryset.annotate(distance=distance_expression(latitude, longitude)).filter(distance__lte=radius_km)
+
+
+def parse_bbox(value):
+    """Parse 'south,west,north,east' into floats, or return None."""
+    try:
+        south, west, north, east = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        return None
+    return south, west, north, east
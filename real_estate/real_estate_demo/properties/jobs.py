@@ -0,0 +1,64 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+
+from core.cache import invalidate_tags
+from core.jobs import enqueue, job
+from core.pagination import count_tag
+
+from .clusters import rebuild_clusters
+from .models import Location, Property, PropertyImage, SearchTerm
+from .search import index_property
+
+
+@job
+def reindex_location(location_id):
+    """Refresh the search index of every listing in or below a location."""
+    location = Location.objects.filter(pk=location_id).first()
+    if location is None or not location.path:
+        return
+    properties = Property.objects.filter(location__path__startswith=location.path).select_related('location')
+    for property_obj in properties.iterator():
+        index_property(property_obj)
+    invalidate_tags(count_tag(SearchTerm))
+
+
+# Images per process_property_images job; each one is encoded several times
+IMAGE_BATCH = 20
+
+
+@job
+def process_property_images(image_ids):
+    """Make the variant ladder of images that do not have one yet."""
+    property_ids = set()
+    for image in PropertyImage.objects.filter(pk__in=image_ids):
+        if not image.variants:
+            image.process_variants()
+            property_ids.add(image.property_id)
+    if property_ids:
+        invalidate_tags(*(f'property:{pk}' for pk in property_ids))
+
+
+def queue_image_processing(image_ids):
+    image_ids = list(image_ids)
+    for start in range(0, len(image_ids), IMAGE_BATCH):
+        enqueue(process_property_images, [image_ids[start:start + IMAGE_BATCH]])
+
+
+@job(every=timedelta(days=1))
+def rebuild_map_clusters():
+    """Recompute the map clusters, correcting any drift of the per-save updates."""
+    rebuild_clusters()
+
+
+@job(every=timedelta(minutes=10), setting='WARM_PAGE_CACHE')
+def warm_page_cache():
+    """
+    Re-render the most visited pages that were expired since the last run.
+
+    Only scheduled with WARM_PAGE_CACHE on, which needs a cache shared by the
+    web processes (Redis, Memcached): with the default per-process locmem
+    cache the worker would only warm its own memory.
+    """
+    call_command('warm_cache', workers=2, stdout=StringIO())
@@ -0,0 +1,88 @@
+import time
+import tracemalloc
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from properties.models import Property
+
+
+def value_size(value):
+    """Rough size of a column value on the wire."""
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (Decimal, date, datetime)):
+        return len(str(value))
+    return 8
+
+
+class Command(BaseCommand):
+    help = 'Compare loading a page of listing cards as full rows and through for_cards()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=12, help='Cards per page (default 12)')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per queryset (default 20)')
+
+    def load(self, queryset, page_size):
+        properties = list(queryset[:page_size])
+        for property_obj in properties:
+            property_obj.get_primary_image()
+        return properties
+
+    def measure(self, queryset, page_size, repeat):
+        with CaptureQueriesContext(connection) as queries:
+            self.load(queryset, page_size)
+
+        # Run the same SQL again to count what came back
+        wire_bytes = rows = 0
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                cursor.execute(query['sql'])
+                for row in cursor.fetchall():
+                    rows += 1
+                    wire_bytes += sum(value_size(value) for value in row)
+
+        tracemalloc.start()
+        properties = self.load(queryset, page_size)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del properties
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            self.load(queryset, page_size)
+        ms = (time.perf_counter() - start) * 1000 / repeat
+
+        return {'queries': len(queries), 'rows': rows, 'bytes': wire_bytes, 'memory': memory, 'ms': ms}
+
+    def handle(self, *args, **options):
+        page_size, repeat = options['page_size'], max(options['repeat'], 1)
+        published = Property.objects.filter(is_published=True)
+        results = {
+            'full rows': self.measure(
+                published.select_related('location').with_primary_image(), page_size, repeat
+            ),
+            'for_cards': self.measure(published.for_cards(), page_size, repeat),
+        }
+
+        self.stdout.write(f'{page_size} cards per page, {repeat} runs')
+        self.stdout.write(f'{"":12}{"queries":>8}{"rows":>6}{"wire bytes":>12}{"memory":>10}{"ms":>8}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:12}{result["queries"]:>8}{result["rows"]:>6}{result["bytes"]:>12}'
+                f'{result["memory"]:>10}{result["ms"]:>8.2f}'
+            )
+
+        full, cards = results['full rows'], results['for_cards']
+        if full['bytes'] and full['memory']:
+            self.stdout.write(self.style.SUCCESS(
+                f'for_cards: {1 - cards["bytes"] / full["bytes"]:.0%} fewer bytes, '
+                f'{1 - cards["memory"] / full["memory"]:.0%} less memory per page'
+            ))
@@ -0,0 +1,130 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import RequestFactory
+
+from admin_portal.views import AdminInquiryListView, AdminPropertyListView
+from properties.models import Location, Property, PropertyFeature, PropertyType
+from properties.views import HomeView, PropertyListView, PropertySearchView
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the querysets behind the listing views and report index usage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan', action='store_true',
+            help='Exit with an error if any query does a full scan of the properties table',
+        )
+
+    def get_cases(self):
+        property_type = PropertyType.objects.first()
+        location = Location.objects.filter(parent=None).first()
+        type_slug = property_type.slug if property_type else 'house'
+        location_slug = location.slug if location else 'dhaka'
+        feature_ids = ','.join(str(pk) for pk in PropertyFeature.objects.values_list('pk', flat=True)[:2]) or '1'
+
+        return [
+            ('home', HomeView, {}),
+            ('list', PropertyListView, {}),
+            ('list type', PropertyListView, {'type': type_slug}),
+            ('list location', PropertyListView, {'location': location_slug}),
+            ('list price', PropertyListView, {'min_price': '100000', 'max_price': '500000'}),
+            ('list features', PropertyListView, {'features': feature_ids}),
+            ('list combined', PropertyListView, {'type': type_slug, 'location': location_slug, 'min_price': '100000'}),
+            ('search', PropertySearchView, {'q': 'modern house'}),
+            ('admin properties', AdminPropertyListView, {}),
+            ('admin inquiries', AdminInquiryListView, {}),
+        ]
+
+    def get_querysets(self, view_class, params):
+        """Yield (name, queryset) pairs as the view would evaluate them."""
+        request = RequestFactory().get('/', params)
+        view = view_class()
+        view.setup(request)
+
+        if hasattr(view, 'get_queryset'):
+            queryset = view.get_queryset()
+            if getattr(view, 'cursor_ordering', None):
+                queryset = queryset.order_by(*view.cursor_ordering)
+            yield 'object_list', queryset[:view.get_paginate_by(queryset) or 20]
+            return
+
+        context = view.get_context_data()
+        if 'paginator' in context:
+            yield 'page', context['paginator'].object_list[:context['paginator'].per_page]
+        for name, value in context.items():
+            if isinstance(value, QuerySet):
+                yield name, value
+
+    def explain(self, queryset):
+        """Return (indexes, scanned tables, estimated rows) for a queryset."""
+        if connection.vendor in ('mysql', 'postgresql'):
+            return self.parse_json_plan(json.loads(queryset.explain(format='json')))
+        return self.parse_text_plan(queryset.explain())
+
+    def parse_json_plan(self, plan):
+        indexes, scans, rows = [], [], None
+        nodes = [plan]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, list):
+                nodes.extend(node)
+                continue
+            if not isinstance(node, dict):
+                continue
+            # PostgreSQL
+            if node.get('Index Name'):
+                indexes.append(node['Index Name'])
+            if node.get('Node Type') == 'Seq Scan':
+                scans.append(node.get('Relation Name'))
+            if rows is None and 'Plan Rows' in node:
+                rows = node['Plan Rows']
+            # MySQL
+            if 'table_name' in node:
+                if node.get('key'):
+                    indexes.append(node['key'])
+                if node.get('access_type') == 'ALL':
+                    scans.append(node['table_name'])
+                if 'rows_examined_per_scan' in node:
+                    rows = (rows or 0) + node['rows_examined_per_scan']
+            nodes.extend(node.values())
+        return indexes, scans, rows
+
+    def parse_text_plan(self, plan):
+        # SQLite: "SEARCH t USING INDEX name (...)", "SCAN t USING INDEX name", "SCAN t"
+        indexes = re.findall(r'USING (?:COVERING )?INDEX (\w+)', plan)
+        scans = []
+        for line in plan.splitlines():
+            match = re.search(r'\bSCAN (?:TABLE )?(\w+)', line)
+            if match and 'USING' not in line:
+                scans.append(match.group(1))
+        return indexes, scans, None
+
+    def handle(self, *args, **options):
+        property_table = Property._meta.db_table
+        failures = []
+
+        self.stdout.write(f'Database backend: {connection.vendor}')
+        for label, view_class, params in self.get_cases():
+            for name, queryset in self.get_querysets(view_class, params):
+                indexes, scans, rows = self.explain(queryset)
+
+                line = f'{label:<18} {name:<20} index: {", ".join(dict.fromkeys(indexes)) or "-"}'
+                if rows is not None:
+                    line += f'  rows: {rows}'
+                if scans:
+                    line += f'  full scan: {", ".join(dict.fromkeys(scans))}'
+
+                if property_table in scans:
+                    failures.append(f'{label}/{name}')
+                    self.stdout.write(self.style.WARNING(line))
+                else:
+                    self.stdout.write(line)
+
+        if failures and options['fail_on_scan']:
+            raise CommandError(f'Full scan of {property_table} in: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Query plan check complete'))
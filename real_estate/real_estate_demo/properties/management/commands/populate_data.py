@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from properties.models import (
@@ -11,6 +12,9 @@ import random
 class Command(BaseCommand):
     help = 'Populate the database with sample data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--warm-cache', action='store_true', help='Pre-render the most visited pages afterwards')
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting data population...'))
         
@@ -309,4 +313,6 @@ class Command(BaseCommand):
         )
         self.stdout.write(
             self.style.WARNING('Note: Property images need to be added manually through the admin panel.')
-        )
\ No newline at end of file
+        )
+        if options['warm_cache']:
+            call_command('warm_cache', stdout=self.stdout, stderr=self.stderr)
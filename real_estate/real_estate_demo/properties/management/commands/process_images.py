@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from properties.jobs import IMAGE_BATCH, process_property_images, queue_image_processing
+from properties.models import PropertyImage
+
+
+class Command(BaseCommand):
+    help = 'Make the responsive variants of property images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--now', action='store_true', help='Process the images here instead of queueing jobs')
+
+    def handle(self, *args, **options):
+        image_ids = [image.pk for image in PropertyImage.objects.only('id', 'variants') if not image.variants]
+        if not options['now']:
+            queue_image_processing(image_ids)
+            self.stdout.write(self.style.SUCCESS(f'Queued {len(image_ids)} images for run_jobs'))
+            return
+
+        for start in range(0, len(image_ids), IMAGE_BATCH):
+            process_property_images(image_ids[start:start + IMAGE_BATCH])
+            self.stdout.write(f'{min(start + IMAGE_BATCH, len(image_ids))}/{len(image_ids)}')
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(image_ids)} images'))
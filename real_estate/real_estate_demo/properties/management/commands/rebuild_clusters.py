@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from properties.clusters import rebuild_clusters
+from properties.models import PropertyCluster
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-aggregated map clusters from the property table'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Rebuilding map clusters...'))
+        rebuild_clusters()
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {PropertyCluster.objects.count()} clusters')
+        )
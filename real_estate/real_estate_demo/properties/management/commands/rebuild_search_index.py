@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from properties.models import Property, SearchTerm
+from properties.search import build_terms
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all published properties'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(self.style.SUCCESS('Rebuilding search index...'))
+        
+        properties = Property.objects.filter(is_published=True).select_related('location')
+        
+        with transaction.atomic():
+            SearchTerm.objects.all().delete()
+            
+            batch = []
+            indexed = 0
+            for property_obj in properties.iterator(chunk_size=batch_size):
+                batch.extend(
+                    SearchTerm(property=property_obj, term=term, weight=weight)
+                    for term, weight in build_terms(property_obj).items()
+                )
+                indexed += 1
+                if len(batch) >= batch_size:
+                    SearchTerm.objects.bulk_create(batch)
+                    batch = []
+            SearchTerm.objects.bulk_create(batch)
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} properties')
+        )
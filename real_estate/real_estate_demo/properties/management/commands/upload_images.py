@@ -0,0 +1,56 @@
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.uploads import UPLOAD_WORKERS, ImageUploader
+
+
+class Command(BaseCommand):
+    help = 'Upload property photos listed in a CSV file to the media backend, resuming where a previous run stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'csv_file', help='CSV with property (slug or title), path and optional alt_text columns; '
+            'paths are relative to the CSV file'
+        )
+        parser.add_argument('--manifest', help='Uploads done so far (default: <csv_file>.manifest.jsonl)')
+        parser.add_argument(
+            '--workers', type=int, default=UPLOAD_WORKERS, help=f'Uploads run at the same time (default {UPLOAD_WORKERS})'
+        )
+
+    def read_rows(self, path):
+        base = os.path.dirname(os.path.abspath(path))
+        try:
+            with open(path, newline='') as f:
+                reader = csv.DictReader(f)
+                if not reader.fieldnames or not {'property', 'path'} <= set(reader.fieldnames):
+                    raise CommandError(f'{path} needs property and path columns')
+                return [
+                    {**row, 'path': os.path.join(base, row['path'])}
+                    for row in reader if row.get('property') and row.get('path')
+                ]
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+    def handle(self, *args, **options):
+        rows = self.read_rows(options['csv_file'])
+        manifest = options['manifest'] or f'{options["csv_file"]}.manifest.jsonl'
+        self.stdout.write(self.style.SUCCESS(f'Uploading {len(rows)} photos with {options["workers"]} workers...'))
+
+        start = time.perf_counter()
+        uploader = ImageUploader(
+            manifest_path=manifest,
+            workers=options['workers'],
+            log=lambda message: self.stdout.write(self.style.WARNING(message)),
+        )
+        stats = uploader.run(rows)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats["uploaded"]} uploaded, {stats["reused"]} already uploaded, {stats["created"]} images created, '
+            f'{stats["existing"]} already attached, {stats["failed"]} failed '
+            f'in {time.perf_counter() - start:.1f}s'
+        ))
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING('Run the command again to retry the failed photos'))
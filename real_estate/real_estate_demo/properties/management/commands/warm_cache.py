@@ -0,0 +1,111 @@
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count, Q
+from django.test import Client
+from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone
+
+from properties.models import Location, Property, PropertyType
+
+
+# Only these views are cached, so only their URLs are worth warming
+CACHED_VIEWS = {'home', 'property_list', 'property_detail'}
+
+ACCESS_LOG_REQUEST = re.compile(r'"GET (\S+) HTTP/[\d.]+" 200 ')
+
+
+class Command(BaseCommand):
+    help = 'Render the most visited pages once so the first visitors after a deploy or import hit a warm cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Number of detail pages to warm (default 20)')
+        parser.add_argument('--days', type=int, default=30, help='Days of favorites and inquiries used to rank listings')
+        parser.add_argument('--access-log', help='Access log (combined format) to take the most requested URLs from')
+        parser.add_argument('--workers', type=int, default=4, help='Pages rendered at the same time (default 4)')
+        parser.add_argument('--host', help='Host header sent with each request')
+
+    def get_urls(self, top, days):
+        """Home, each property type and top-level location list, and the listings with the most recent activity."""
+        list_url = reverse('property_list')
+        urls = [reverse('home'), list_url]
+        urls += [f'{list_url}?{urlencode({"type": slug})}' for slug in PropertyType.objects.values_list('slug', flat=True)]
+        urls += [
+            f'{list_url}?{urlencode({"location": slug})}'
+            for slug in Location.objects.filter(parent=None).values_list('slug', flat=True)
+        ]
+
+        since = timezone.now() - timedelta(days=days)
+        popular = Property.objects.filter(is_published=True).annotate(
+            activity=Count('favorite', filter=Q(favorite__created_at__gte=since), distinct=True)
+            + Count('inquiries', filter=Q(inquiries__created_at__gte=since), distinct=True),
+        ).order_by('-activity', '-is_featured', '-created_at').values_list('slug', flat=True)[:top]
+        urls += [reverse('property_detail', args=[slug]) for slug in popular]
+        return urls
+
+    def get_log_urls(self, path, top):
+        """Most requested cached URLs in an access log."""
+        counts = Counter()
+        try:
+            with open(path, errors='replace') as log:
+                for line in log:
+                    match = ACCESS_LOG_REQUEST.search(line)
+                    if match:
+                        counts[match.group(1)] += 1
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        urls = []
+        for url, _ in counts.most_common():
+            try:
+                match = resolve(urlsplit(url).path)
+            except Resolver404:
+                continue
+            if match.url_name in CACHED_VIEWS:
+                urls.append(url)
+                if len(urls) == top:
+                    break
+        return urls
+
+    def render(self, url, host):
+        client = Client(HTTP_HOST=host)
+        start = time.perf_counter()
+        try:
+            status = client.get(url).status_code
+        except Exception as e:
+            status = f'error: {e}'
+        finally:
+            # Each thread opened its own connection
+            connections.close_all()
+        return url, status, (time.perf_counter() - start) * 1000
+
+    def handle(self, *args, **options):
+        urls = self.get_urls(options['top'], options['days'])
+        if options['access_log']:
+            urls += self.get_log_urls(options['access_log'], options['top'])
+        urls = list(dict.fromkeys(urls))
+
+        if 'locmem' in settings.CACHES['default']['BACKEND'].lower():
+            self.stdout.write(self.style.WARNING(
+                'The cache is local to this process: the server workers will not see these pages'
+            ))
+
+        host = options['host'] or next((host for host in settings.ALLOWED_HOSTS if '*' not in host), 'localhost')
+        self.stdout.write(self.style.SUCCESS(f'Warming {len(urls)} pages...'))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as pool:
+            results = list(pool.map(lambda url: self.render(url, host), urls))
+
+        for url, status, ms in sorted(results, key=lambda result: -result[2]):
+            line = f'{ms:8.1f} ms  {status}  {url}'
+            self.stdout.write(line if status == 200 else self.style.WARNING(line))
+        self.stdout.write(
+            self.style.SUCCESS(f'Warmed {len(urls)} pages in {time.perf_counter() - start:.1f}s')
+        )
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:30
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A copy of properties.search as it was when this migration was written, so
+# later changes to the tokenizer don't change what it does
+FIELD_WEIGHTS = {"title": 10, "location": 6, "address": 4, "description": 1}
+MAX_TERM_WEIGHT = 50
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 50
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "the", "this", "to", "with",
+}
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    terms = []
+    for token in TOKEN_RE.findall((text or "").lower()):
+        token = token[:MAX_TERM_LENGTH]
+        if len(token) >= MIN_TERM_LENGTH and token not in STOP_WORDS:
+            terms.append(token)
+    return terms
+
+
+def build_terms(property_obj):
+    location = property_obj.location
+    fields = {
+        "title": property_obj.title,
+        "location": f"{location.name} {location.parent.name if location.parent else ''}",
+        "address": property_obj.address,
+        "description": property_obj.description,
+    }
+    weights = Counter()
+    for field, text in fields.items():
+        for term in tokenize(text):
+            weights[term] += FIELD_WEIGHTS[field]
+    return {term: min(weight, MAX_TERM_WEIGHT) for term, weight in weights.items()}
+
+
+def build_search_index(apps, schema_editor):
+    Property = apps.get_model("properties", "Property")
+    SearchTerm = apps.get_model("properties", "SearchTerm")
+
+    properties = Property.objects.filter(is_published=True).select_related(
+        "location__parent"
+    )
+    for property_obj in properties.iterator():
+        SearchTerm.objects.bulk_create(
+            SearchTerm(property=property_obj, term=term, weight=weight)
+            for term, weight in build_terms(property_obj).items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0003_contact"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=50)),
+                ("weight", models.PositiveIntegerField(default=1)),
+                (
+                    "property",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_terms",
+                        to="properties.property",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("term", "property")},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
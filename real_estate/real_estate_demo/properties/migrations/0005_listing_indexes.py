@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0004_searchterm"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inquiry",
+            index=models.Index(fields=["-created_at"], name="inquiry_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="inquiry",
+            index=models.Index(
+                fields=["status", "-created_at"], name="inquiry_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["is_published", "-created_at"], name="property_pub_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["is_published", "is_featured", "-created_at"],
+                name="property_pub_featured_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["is_published", "property_type", "-created_at"],
+                name="property_pub_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["is_published", "location", "-created_at"],
+                name="property_pub_location_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["is_published", "price"], name="property_pub_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(fields=["-created_at"], name="property_created_idx"),
+        ),
+    ]
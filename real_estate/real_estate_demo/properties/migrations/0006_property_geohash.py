@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:35
+
+from django.db import migrations, models
+
+
+def fill_geohash(apps, schema_editor):
+    from properties.geo import encode_geohash
+
+    Property = apps.get_model("properties", "Property")
+    properties = Property.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    )
+    for property_obj in properties.iterator():
+        property_obj.geohash = encode_geohash(
+            property_obj.latitude, property_obj.longitude
+        )
+        property_obj.save(update_fields=["geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0005_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="geohash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=12
+            ),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
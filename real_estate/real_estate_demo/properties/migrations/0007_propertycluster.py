@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:36
+
+from django.db import migrations, models
+from django.db.models import Count, FloatField, Max, Min, Sum
+from django.db.models.functions import Cast, Substr
+
+
+def build_clusters(apps, schema_editor):
+    Property = apps.get_model("properties", "Property")
+    PropertyCluster = apps.get_model("properties", "PropertyCluster")
+
+    published = Property.objects.filter(is_published=True).exclude(geohash="")
+    for precision in range(1, 8):
+        rows = (
+            published.annotate(cell=Substr("geohash", 1, precision))
+            .values("cell")
+            .annotate(
+                count=Count("id"),
+                latitude_sum=Sum(Cast("latitude", FloatField())),
+                longitude_sum=Sum(Cast("longitude", FloatField())),
+                min_price=Min("price"),
+                max_price=Max("price"),
+            )
+            .order_by()
+        )
+        PropertyCluster.objects.bulk_create(
+            [PropertyCluster(precision=precision, **row) for row in rows]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0006_property_geohash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PropertyCluster",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("precision", models.PositiveSmallIntegerField()),
+                ("cell", models.CharField(max_length=12)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("latitude_sum", models.FloatField(default=0)),
+                ("longitude_sum", models.FloatField(default=0)),
+                ("min_price", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("max_price", models.DecimalField(decimal_places=2, max_digits=12)),
+            ],
+            options={
+                "unique_together": {("precision", "cell")},
+            },
+        ),
+        migrations.RunPython(build_clusters, migrations.RunPython.noop),
+    ]
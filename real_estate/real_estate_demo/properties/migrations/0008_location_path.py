@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:41
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    Location = apps.get_model("properties", "Location")
+    parents = {None: ("", "")}
+    pending = list(Location.objects.all())
+    while pending:
+        remaining = []
+        for location in pending:
+            if location.parent_id not in parents:
+                remaining.append(location)
+                continue
+            parent_path, parent_name = parents[location.parent_id]
+            location.path = f"{parent_path}{location.pk}/"
+            location.full_name = (
+                f"{location.name}, {parent_name}" if parent_name else location.name
+            )
+            location.save(update_fields=["path", "full_name"])
+            parents[location.pk] = (location.path, location.full_name)
+        if len(remaining) == len(pending):
+            break
+        pending = remaining
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0007_propertycluster"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="location",
+            name="full_name",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="location",
+            name="path",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
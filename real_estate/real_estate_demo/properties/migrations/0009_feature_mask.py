@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:44
+
+from django.db import migrations, models
+
+
+def fill_feature_masks(apps, schema_editor):
+    PropertyFeature = apps.get_model("properties", "PropertyFeature")
+    Property = apps.get_model("properties", "Property")
+
+    bits = {}
+    for bit, feature in enumerate(PropertyFeature.objects.order_by("id")[:63]):
+        feature.bit = bit
+        feature.save(update_fields=["bit"])
+        bits[feature.pk] = bit
+
+    masks = {}
+    through = Property.features.through
+    for property_id, feature_id in through.objects.values_list(
+        "property_id", "propertyfeature_id"
+    ):
+        if feature_id in bits:
+            masks[property_id] = masks.get(property_id, 0) | 1 << bits[feature_id]
+    for property_id, mask in masks.items():
+        Property.objects.filter(pk=property_id).update(feature_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0008_location_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="feature_mask",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="propertyfeature",
+            name="bit",
+            field=models.PositiveSmallIntegerField(
+                blank=True, editable=False, null=True, unique=True
+            ),
+        ),
+        migrations.RunPython(fill_feature_masks, migrations.RunPython.noop),
+    ]
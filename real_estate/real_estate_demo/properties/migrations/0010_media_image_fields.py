@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:20
+
+import core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0009_feature_mask"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="agent",
+            name="profile_image",
+            field=core.fields.MediaImageField(
+                blank=True, folder="agents", null=True, verbose_name="agent_profiles"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="propertyimage",
+            name="image",
+            field=core.fields.MediaImageField(
+                folder="properties", verbose_name="property_images"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="testimonial",
+            name="image",
+            field=core.fields.MediaImageField(
+                blank=True,
+                folder="testimonials",
+                null=True,
+                verbose_name="testimonials",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0010_media_image_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="propertyimage",
+            name="height",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="propertyimage",
+            name="variants",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="propertyimage",
+            name="width",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,9 +1,14 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
-from cloudinary.models import CloudinaryField
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from core.fields import MediaImageField
+from core.media import media_backend
+from core.managers import ReferenceManager
+from .geo import encode_geohash
+
 
 class PropertyType(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -11,6 +16,8 @@ class PropertyType(models.Model):
     description = models.TextField(blank=True)
     icon = models.CharField(max_length=50, blank=True)
     
+    objects = ReferenceManager()
+    
     def __str__(self):
         return self.name
     
@@ -25,20 +32,68 @@ class Location(models.Model):
     latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
     
+    # Materialized hierarchy, maintained in save(): the ancestor ids down to
+    # this one ("1/5/") and the display name ("Mirpur, Dhaka")
+    path = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    full_name = models.CharField(max_length=255, blank=True, editable=False)
+    
+    objects = ReferenceManager()
+    
     def __str__(self):
-        if self.parent:
-            return f"{self.name}, {self.parent.name}"
-        return self.name
+        return self.full_name or self.name
     
     class Meta:
         unique_together = ['name', 'parent']
+    
+    def clean(self):
+        super().clean()
+        if self.path and self.parent and self.parent.path.startswith(self.path):
+            raise ValidationError({'parent': 'A location cannot be placed under itself or one of its descendants.'})
+    
+    def save(self, *args, **kwargs):
+        if self.path and self.parent and self.parent.path.startswith(self.path):
+            raise ValueError('A location cannot be placed under itself or one of its descendants.')
+        
+        old_path, old_full_name = self.path, self.full_name
+        parent_path = self.parent.path if self.parent else ''
+        self.full_name = f"{self.name}, {self.parent.full_name}" if self.parent else self.name
+        if self.pk:
+            self.path = f"{parent_path}{self.pk}/"
+        super().save(*args, **kwargs)
+        
+        if not old_path:
+            # New rows only know their primary key once inserted
+            self.path = f"{parent_path}{self.pk}/"
+            Location.objects.filter(pk=self.pk).update(path=self.path)
+        elif (old_path, old_full_name) != (self.path, self.full_name):
+            self._update_descendants(old_path)
+    
+    def _update_descendants(self, old_path):
+        """Rewrite the path and name of every location below this one."""
+        descendants = sorted(
+            Location.objects.filter(path__startswith=old_path).exclude(pk=self.pk),
+            key=lambda location: location.path.count('/'),
+        )
+        parents = {self.pk: self}
+        for location in descendants:
+            parent = parents[location.parent_id]
+            location.path = f"{parent.path}{location.pk}/"
+            location.full_name = f"{location.name}, {parent.full_name}"
+            parents[location.pk] = location
+        Location.objects.bulk_update(descendants, ['path', 'full_name'], batch_size=500)
+    
+    def get_descendants(self, include_self=True):
+        locations = Location.objects.filter(path__startswith=self.path)
+        if not include_self:
+            locations = locations.exclude(pk=self.pk)
+        return locations
 
 
 class Agent(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     phone = models.CharField(max_length=20)
     bio = models.TextField(blank=True)
-    profile_image = CloudinaryField('agent_profiles', blank=True, null=True)
+    profile_image = MediaImageField('agent_profiles', folder='agents', blank=True, null=True)
     experience_years = models.PositiveIntegerField(default=0)
     license_number = models.CharField(max_length=50, blank=True)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00,
@@ -54,12 +109,57 @@ class Agent(models.Model):
         return self.user.get_full_name() or self.user.username
 
 
+# Features get a bit in Property.feature_mask; a signed 64-bit column holds 63
+FEATURE_MASK_BITS = 63
+
+
 class PropertyFeature(models.Model):
     name = models.CharField(max_length=100, unique=True)
     icon = models.CharField(max_length=50, blank=True)
+    # Position in Property.feature_mask, None once every bit is taken
+    bit = models.PositiveSmallIntegerField(null=True, blank=True, unique=True, editable=False)
+    
+    objects = ReferenceManager()
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            used = set(PropertyFeature.objects.exclude(bit=None).values_list('bit', flat=True))
+            self.bit = next((bit for bit in range(FEATURE_MASK_BITS) if bit not in used), None)
+        super().save(*args, **kwargs)
+
+
+# Columns a listing card renders (plus what ordering and cursors need)
+CARD_FIELDS = (
+    'id', 'slug', 'title', 'price', 'bedrooms', 'bathrooms', 'area_sqft',
+    'listing_type', 'created_at', 'location__name',
+)
+
+
+class PropertyQuerySet(models.QuerySet):
+    def for_cards(self):
+        """
+        Just the columns of a listing card: no description, address or meta
+        text. The location name is joined and the primary image read in
+        the same query, with its variants.
+        """
+        primary = PropertyImage.objects.filter(property=models.OuterRef('pk'), is_primary=True)
+        return self.select_related('location').only(*CARD_FIELDS).annotate(
+            primary_image=models.Subquery(primary.values('image')[:1]),
+            primary_image_variants=models.Subquery(primary.values('variants')[:1]),
+        )
+    
+    def with_primary_image(self):
+        """Prefetch the primary image of every row in a single extra query."""
+        return self.prefetch_related(
+            models.Prefetch(
+                'images',
+                queryset=PropertyImage.objects.filter(is_primary=True),
+                to_attr='primary_images',
+            )
+        )
 
 
 class Property(models.Model):
@@ -91,6 +191,7 @@ class Property(models.Model):
     address = models.TextField()
     latitude = models.DecimalField(max_digits=10, decimal_places=8, null=True, blank=True)
     longitude = models.DecimalField(max_digits=11, decimal_places=8, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     
     # Property details
     bedrooms = models.PositiveIntegerField()
@@ -102,6 +203,8 @@ class Property(models.Model):
     
     # Features and amenities
     features = models.ManyToManyField(PropertyFeature, blank=True)
+    # Bits of the features above, kept in sync by the m2m_changed signal
+    feature_mask = models.BigIntegerField(default=0, editable=False)
     
     # Agent and management
     agent = models.ForeignKey(Agent, on_delete=models.CASCADE)
@@ -118,35 +221,102 @@ class Property(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PropertyQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Properties"
+        indexes = [
+            # Public listing pages: published rows, newest first
+            models.Index(fields=['is_published', '-created_at'], name='property_pub_created_idx'),
+            models.Index(fields=['is_published', 'is_featured', '-created_at'], name='property_pub_featured_idx'),
+            models.Index(fields=['is_published', 'property_type', '-created_at'], name='property_pub_type_idx'),
+            models.Index(fields=['is_published', 'location', '-created_at'], name='property_pub_location_idx'),
+            models.Index(fields=['is_published', 'price'], name='property_pub_price_idx'),
+            # Admin portal lists every property newest first
+            models.Index(fields=['-created_at'], name='property_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        if kwargs.get('update_fields') is not None and {'latitude', 'longitude'} & set(kwargs['update_fields']):
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'geohash'}
+        super().save(*args, **kwargs)
+    
     def get_absolute_url(self):
         return reverse('property_detail', kwargs={'slug': self.slug})
     
     def get_primary_image(self):
-        primary_image = self.images.filter(is_primary=True).first()
-        return primary_image.image if primary_image else None
+        # Reuse the value loaded by PropertyQuerySet.for_cards() or with_primary_image()
+        if hasattr(self, 'primary_image'):
+            if self.primary_image:
+                self.primary_image.variants = self.primary_image_variants or []
+            return self.primary_image
+        if hasattr(self, 'primary_images'):
+            primary_image = self.primary_images[0] if self.primary_images else None
+        else:
+            primary_image = self.images.filter(is_primary=True).first()
+            self.primary_images = [primary_image] if primary_image else []
+        return primary_image.get_image() if primary_image else None
+    
+    def get_features(self):
+        # Read the features off feature_mask; only features past the last
+        # bit need the M2M table
+        features = PropertyFeature.objects.cached()
+        if any(feature.bit is None for feature in features):
+            return list(self.features.all())
+        return [feature for feature in features if self.feature_mask >> feature.bit & 1]
 
 
 class PropertyImage(models.Model):
     property = models.ForeignKey(Property, related_name='images', on_delete=models.CASCADE)
-    image = CloudinaryField('property_images')
+    image = MediaImageField('property_images', folder='properties')
     alt_text = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
     
+    # Filled in by the process_property_images job after upload
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=list, blank=True)
+    
     class Meta:
         ordering = ['order']
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
+    
     def save(self, *args, **kwargs):
         if self.is_primary:
             PropertyImage.objects.filter(property=self.property, is_primary=True).update(is_primary=False)
+        if self.pk and self.image != getattr(self, '_loaded_image', self.image):
+            # A new picture: its variants are made again
+            self.width = self.height = None
+            self.variants = []
         super().save(*args, **kwargs)
+        self._loaded_image = self.image
+    
+    def get_image(self):
+        """The image with its variants, for {% responsive_image %}."""
+        if self.image:
+            self.image.variants = self.variants
+        return self.image
+    
+    def process_variants(self):
+        """Make the variant ladder for the image and record it."""
+        self.width, self.height, self.variants = media_backend().make_variants(self.image.name)
+        PropertyImage.objects.filter(pk=self.pk, image=self.image.name).update(
+            width=self.width, height=self.height, variants=self.variants,
+        )
     
     def __str__(self):
         return f"{self.property.title} - Image {self.order}"
@@ -191,6 +361,10 @@ class Inquiry(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Inquiries"
+        indexes = [
+            models.Index(fields=['-created_at'], name='inquiry_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='inquiry_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.property.title}"
@@ -199,7 +373,7 @@ class Inquiry(models.Model):
 class Testimonial(models.Model):
     name = models.CharField(max_length=100)
     role = models.CharField(max_length=100, blank=True)
-    image = CloudinaryField('testimonials', blank=True, null=True)
+    image = MediaImageField('testimonials', folder='testimonials', blank=True, null=True)
     content = models.TextField()
     rating = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     property = models.ForeignKey(Property, on_delete=models.SET_NULL, null=True, blank=True)
@@ -267,3 +441,41 @@ class Contact(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.subject}"
+
+
+class SearchTerm(models.Model):
+    """Inverted index entry used by the property search."""
+    term = models.CharField(max_length=50)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveIntegerField(default=1)
+    
+    class Meta:
+        unique_together = ['term', 'property']
+    
+    def __str__(self):
+        return f"{self.term} - {self.property_id}"
+
+
+class PropertyCluster(models.Model):
+    """Pre-aggregated map markers: published listings per geohash cell."""
+    precision = models.PositiveSmallIntegerField()
+    cell = models.CharField(max_length=12)
+    count = models.PositiveIntegerField(default=0)
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2)
+    max_price = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    class Meta:
+        unique_together = ['precision', 'cell']
+    
+    def __str__(self):
+        return f"{self.cell} ({self.count})"
+    
+    @property
+    def latitude(self):
+        return self.latitude_sum / self.count
+    
+    @property
+    def longitude(self):
+        return self.longitude_sum / self.count
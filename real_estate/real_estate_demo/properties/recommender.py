@@ -0,0 +1,152 @@
+import numpy as np
+
+from .columns import ColumnState, SyncedColumns, invalidate_columns
+from .geo import EARTH_RADIUS_KM
+from .models import Property
+
+
+VERSION_KEY = 'recommender:version'
+EPOCH_KEY = 'recommender:epoch'
+
+# Weights of each term in the distance between two listings
+WEIGHTS = {
+    'price': 2.0,
+    'area': 1.0,
+    'bedrooms': 1.0,
+    'bathrooms': 0.5,
+    'geo': 1.5,
+    'features': 1.0,
+    'property_type': 1.0,
+}
+
+# Listings scored per request: this many on either side of the target's price
+CANDIDATE_WINDOW = 1024
+
+# Distance (km) at which the geo term reaches 1
+GEO_SCALE_KM = 10.0
+
+LISTING_TYPES = {value: code for code, (value, _) in enumerate(Property.LISTING_TYPE_CHOICES)}
+
+FIELDS = (
+    'id', 'price', 'area_sqft', 'bedrooms', 'bathrooms', 'latitude', 'longitude',
+    'location__latitude', 'location__longitude', 'property_type_id', 'location_id',
+    'listing_type', 'feature_mask', 'is_published', 'updated_at',
+)
+
+
+def invalidate_recommender(full=False):
+    """Tell every worker its matrix is stale; ``full`` forces a rebuild (after deletes)."""
+    invalidate_columns(VERSION_KEY, EPOCH_KEY, full)
+
+
+class SimilarityState(ColumnState):
+    """One consistent version of the matrix (see ColumnState)."""
+    COLUMNS = {
+        'ids': np.int64,
+        'active': np.bool_,
+        # log price, log area, bedrooms, bathrooms
+        'numeric': (np.float32, 4),
+        # latitude / longitude in radians, NaN when unknown
+        'coords': (np.float32, 2),
+        'property_type': np.int64,
+        'location': np.int64,
+        'listing_type': np.int8,
+        'features': np.uint64,
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.scale = np.ones(4, dtype=np.float32)
+        self.by_price = {}
+
+    def set_row(self, i, row):
+        latitude = row['latitude'] if row['latitude'] is not None else row['location__latitude']
+        longitude = row['longitude'] if row['longitude'] is not None else row['location__longitude']
+        self.active[i] = row['is_published']
+        self.numeric[i] = (
+            np.log1p(float(row['price'])),
+            np.log1p(row['area_sqft']),
+            row['bedrooms'],
+            float(row['bathrooms']),
+        )
+        self.coords[i] = (
+            np.radians(float(latitude)) if latitude is not None else np.nan,
+            np.radians(float(longitude)) if longitude is not None else np.nan,
+        )
+        self.property_type[i] = row['property_type_id']
+        self.location[i] = row['location_id']
+        self.listing_type[i] = LISTING_TYPES.get(row['listing_type'], -1)
+        self.features[i] = row['feature_mask']
+
+    def finish(self):
+        published = self.numeric[self.active]
+        self.scale = published.std(axis=0) if len(published) else np.ones(4, dtype=np.float32)
+        self.scale[self.scale == 0] = 1
+        self._sort()
+
+    def _sort(self):
+        """Per listing type, active rows ordered by price: the candidate windows."""
+        self.by_price = {}
+        for code in np.unique(self.listing_type[self.active]):
+            rows = np.flatnonzero(self.active & (self.listing_type == code))
+            rows = rows[np.argsort(self.numeric[rows, 0], kind='stable')]
+            self.by_price[int(code)] = (rows, self.numeric[rows, 0])
+
+
+class SimilarityIndex(SyncedColumns):
+    """
+    Compact in-memory matrix of published listings for nearest-neighbour
+    lookups, kept in sync per worker (see SyncedColumns).
+    """
+    state_class = SimilarityState
+    fields = FIELDS
+    version_key = VERSION_KEY
+    epoch_key = EPOCH_KEY
+
+    def similar(self, property_id, k=4):
+        """Ids of the ``k`` published listings closest to ``property_id``."""
+        self.refresh()
+        state = self.state
+        i = state.positions.get(property_id)
+        if i is None or int(state.listing_type[i]) not in state.by_price:
+            return []
+
+        # Only score the listings of the same type (sale/rent) nearest in price;
+        # anything outside the window would lose on the price term anyway
+        rows, prices = state.by_price[int(state.listing_type[i])]
+        position = np.searchsorted(prices, state.numeric[i, 0])
+        candidates = rows[max(position - CANDIDATE_WINDOW, 0):position + CANDIDATE_WINDOW]
+        candidates = candidates[candidates != i]
+        if not len(candidates):
+            return []
+
+        diff = np.abs(state.numeric[candidates] - state.numeric[i]) / state.scale
+        score = diff @ np.array(
+            [WEIGHTS['price'], WEIGHTS['area'], WEIGHTS['bedrooms'], WEIGHTS['bathrooms']], dtype=np.float32
+        )
+
+        # Haversine distance, falling back to "same location" when coordinates are missing
+        lat, lng = state.coords[candidates, 0], state.coords[candidates, 1]
+        lat0, lng0 = state.coords[i]
+        a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat) * np.cos(lat0) * np.sin((lng - lng0) / 2) ** 2
+        km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+        geo = np.minimum(km / GEO_SCALE_KM, 3)
+        missing = np.isnan(geo)
+        geo[missing] = state.location[candidates][missing] != state.location[i]
+        score += WEIGHTS['geo'] * geo
+
+        # Jaccard distance between feature bit vectors
+        features = state.features[candidates]
+        union = np.bitwise_count(features | state.features[i]).astype(np.float32)
+        common = np.bitwise_count(features & state.features[i]).astype(np.float32)
+        score += WEIGHTS['features'] * np.where(union > 0, 1 - common / np.maximum(union, 1), 0)
+
+        score += WEIGHTS['property_type'] * (state.property_type[candidates] != state.property_type[i])
+
+        k = min(k, len(candidates))
+        nearest = np.argpartition(score, k - 1)[:k]
+        nearest = nearest[np.argsort(score[nearest])]
+        return state.ids[candidates[nearest]].tolist()
+
+
+similarity_index = SimilarityIndex()
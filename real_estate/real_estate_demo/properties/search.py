@@ -0,0 +1,114 @@
+import re
+from collections import Counter
+
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+
+from .models import Property, SearchTerm
+
+
+# Relative weight of a term depending on the field it was found in
+FIELD_WEIGHTS = {
+    'title': 10,
+    'location': 6,
+    'address': 4,
+    'description': 1,
+}
+
+# Cap repeated words so long descriptions don't drown out the title
+MAX_TERM_WEIGHT = 50
+
+MIN_TERM_LENGTH = 2
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'this', 'to', 'with',
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Split text into lowercase index terms."""
+    terms = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        token = token[:SearchTerm._meta.get_field('term').max_length]
+        if len(token) >= MIN_TERM_LENGTH and token not in STOP_WORDS:
+            terms.append(token)
+    return terms
+
+
+def build_terms(property_obj):
+    """Return a {term: weight} mapping for a single property."""
+    location = property_obj.location
+    fields = {
+        'title': property_obj.title,
+        # The full name holds every ancestor ("DOHS, Mirpur, Dhaka"), so a
+        # listing is found by the name of any region it lies in
+        'location': location.full_name or location.name,
+        'address': property_obj.address,
+        'description': property_obj.description,
+    }
+
+    weights = Counter()
+    for field, text in fields.items():
+        for term in tokenize(text):
+            weights[term] += FIELD_WEIGHTS[field]
+    return {term: min(weight, MAX_TERM_WEIGHT) for term, weight in weights.items()}
+
+
+def index_property(property_obj):
+    """(Re)build the index entries of one property."""
+    SearchTerm.objects.filter(property=property_obj).delete()
+    if not property_obj.is_published:
+        return
+
+    SearchTerm.objects.bulk_create([
+        SearchTerm(property=property_obj, term=term, weight=weight)
+        for term, weight in build_terms(property_obj).items()
+    ])
+
+
+def search_properties(query):
+    """
+    Rank published properties against a free text query.
+
+    Every word has to match; the last one is treated as a prefix so results
+    show up while the user is still typing. Returns a queryset of
+    ``{'property': id, 'score': n}`` rows ordered by relevance.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return SearchTerm.objects.none().values('property')
+
+    *exact_terms, last_term = terms
+    conditions = [Q(term=term) for term in exact_terms]
+    conditions.append(Q(term__startswith=last_term))
+
+    match_any = Q()
+    for condition in conditions:
+        match_any |= condition
+
+    # One flag per query word, so a property only qualifies once all of them matched
+    flags = {
+        f'match_{i}': Max(Case(When(condition, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for i, condition in enumerate(conditions)
+    }
+
+    return (
+        SearchTerm.objects
+        .filter(match_any)
+        .values('property')
+        .annotate(score=Sum('weight'), **flags)
+        .filter(**{name: 1 for name in flags})
+        .order_by('-score', '-property')
+        .values('property', 'score')
+    )
+
+
+def fetch_ranked(rows, queryset=None):
+    """Load the Property objects for a page of ranked rows, keeping their order."""
+    if queryset is None:
+        queryset = Property.objects.all()
+    ids = [row['property'] for row in rows]
+    properties = queryset.filter(is_published=True).in_bulk(ids)
+    return [properties[pk] for pk in ids if pk in properties]
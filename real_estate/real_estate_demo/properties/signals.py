@@ -0,0 +1,231 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+
+from core.cache import invalidate_tags, object_tag
+from core.jobs import enqueue
+from core.pagination import count_tag
+
+from .autocomplete import invalidate_autocomplete
+from .clusters import cluster_state, update_clusters
+from .facets import invalidate_facets
+from .features import clear_feature_bit, refresh_feature_masks
+from .jobs import process_property_images, reindex_location
+from .models import (
+    Agent, Contact, Favorite, Inquiry, Location, Property, PropertyFeature, PropertyImage, PropertyType, SearchTerm,
+    Testimonial,
+)
+from .recommender import invalidate_recommender
+from .search import index_property
+from .snapshot import invalidate_snapshot
+
+
+@receiver(post_save, sender=Property)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_property(instance)
+    invalidate_tags(count_tag(SearchTerm))
+
+
+@receiver(post_save, sender=Location)
+def reindex_location_properties(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Location names are part of the index, so refresh every listing below
+    # it; a big area can hold thousands, so that runs in a job
+    if not instance.path:
+        return
+    enqueue(reindex_location, [instance.pk], dedupe_key=f'reindex-location:{instance.pk}')
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=PropertyType)
+@receiver(post_delete, sender=PropertyType)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=PropertyFeature)
+@receiver(post_delete, sender=PropertyFeature)
+def update_facet_counts(sender, **kwargs):
+    invalidate_facets()
+
+
+# Fields that decide which listings the home, list and similar listing
+# blocks show and in what order; other changes only show on the listing's
+# own card and page, which carry its object tag
+LISTING_FIELDS = (
+    'is_published', 'is_featured', 'price', 'area_sqft', 'bedrooms', 'bathrooms', 'property_type_id',
+    'location_id', 'listing_type', 'latitude', 'longitude', 'feature_mask',
+)
+
+
+def listing_values(property_obj):
+    return tuple(getattr(property_obj, name) for name in LISTING_FIELDS)
+
+
+@receiver(pre_save, sender=Property)
+def remember_old_state(sender, instance, raw=False, **kwargs):
+    instance._old_cluster_state = instance._old_listing_values = None
+    if raw or instance.pk is None:
+        return
+    old = Property.objects.filter(pk=instance.pk).only('geohash', *LISTING_FIELDS).first()
+    if old is not None:
+        instance._old_cluster_state = cluster_state(old)
+        instance._old_listing_values = listing_values(old)
+
+
+@receiver(post_save, sender=Property)
+def update_map_clusters(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_clusters(getattr(instance, '_old_cluster_state', None), cluster_state(instance))
+
+
+@receiver(post_delete, sender=Property)
+def remove_from_map_clusters(sender, instance, **kwargs):
+    update_clusters(cluster_state(instance), None)
+
+
+@receiver(post_save, sender=Property)
+def update_recommender(sender, instance, raw=False, **kwargs):
+    invalidate_recommender()
+
+
+@receiver(post_delete, sender=Property)
+def rebuild_recommender(sender, instance, **kwargs):
+    invalidate_recommender(full=True)
+
+
+@receiver(post_save, sender=Property)
+def update_snapshot(sender, instance, raw=False, **kwargs):
+    invalidate_snapshot()
+
+
+@receiver(post_delete, sender=Property)
+def reload_snapshot(sender, instance, **kwargs):
+    invalidate_snapshot(full=True)
+
+
+@receiver(m2m_changed, sender=Property.features.through)
+def update_feature_masks(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # clear() sends no pk_set, so remember which listings lose the feature
+        instance._cleared_property_ids = list(instance.property_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        property_ids = [instance.pk]
+    elif action == 'post_clear':
+        property_ids = getattr(instance, '_cleared_property_ids', ())
+    else:
+        property_ids = pk_set or ()
+    masks = refresh_feature_masks(property_ids)
+    if not reverse:
+        instance.feature_mask = masks[instance.pk]
+    invalidate_facets()
+    invalidate_recommender()
+    invalidate_snapshot()
+    invalidate_tags('listings', count_tag(Property), *[f'property:{pk}' for pk in property_ids])
+
+
+@receiver(post_delete, sender=PropertyFeature)
+def remove_feature_bit(sender, instance, **kwargs):
+    if instance.bit is not None:
+        clear_feature_bit(instance.bit)
+        invalidate_facets()
+        invalidate_recommender()
+        invalidate_snapshot()
+        invalidate_tags(count_tag(Property))
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def update_location_autocomplete(sender, **kwargs):
+    invalidate_autocomplete()
+
+
+@receiver(post_save, sender=Property)
+def expire_property_pages(sender, instance, **kwargs):
+    old = getattr(instance, '_old_listing_values', None)
+    if old is not None and old == listing_values(instance):
+        invalidate_tags(object_tag(instance))
+    else:
+        invalidate_tags('listings', object_tag(instance))
+
+
+@receiver(post_delete, sender=Property)
+def expire_deleted_property_pages(sender, instance, **kwargs):
+    invalidate_tags('listings', object_tag(instance))
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+def expire_property_image_pages(sender, instance, **kwargs):
+    invalidate_tags(f'property:{instance.property_id}')
+
+
+@receiver(post_save, sender=PropertyImage)
+def process_new_image(sender, instance, raw=False, **kwargs):
+    if raw or instance.variants or not instance.image:
+        return
+    enqueue(process_property_images, [[instance.pk]], dedupe_key=f'image-variants:{instance.pk}')
+
+
+@receiver(post_save, sender=PropertyFeature)
+@receiver(post_delete, sender=PropertyFeature)
+def expire_feature_pages(sender, **kwargs):
+    # Renames show on detail pages, deletions change which listings match
+    invalidate_tags('features', 'listings')
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def expire_location_pages(sender, **kwargs):
+    # Moving a location changes which listings its filter counts
+    invalidate_tags('locations', count_tag(Property))
+
+
+@receiver(post_save, sender=PropertyType)
+@receiver(post_delete, sender=PropertyType)
+def expire_property_type_pages(sender, **kwargs):
+    invalidate_tags('property_types')
+
+
+@receiver(post_save, sender=Testimonial)
+@receiver(post_delete, sender=Testimonial)
+def expire_testimonial_pages(sender, **kwargs):
+    invalidate_tags('testimonials')
+
+
+@receiver(post_save, sender=Agent)
+def expire_agent_pages(sender, instance, **kwargs):
+    invalidate_tags(object_tag(instance))
+
+
+# User fields shown for an agent on detail pages
+AGENT_USER_FIELDS = {'first_name', 'last_name', 'email', 'username'}
+
+
+@receiver(post_save, sender=User)
+def expire_agent_user_pages(sender, instance, update_fields=None, **kwargs):
+    # Agent names on detail pages come from the user; saves of other fields,
+    # like last_login on every sign in, don't change them
+    if update_fields is not None and not AGENT_USER_FIELDS & set(update_fields):
+        return
+    invalidate_tags(*[f'agent:{pk}' for pk in Agent.objects.filter(user=instance).values_list('pk', flat=True)])
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=Inquiry)
+@receiver(post_delete, sender=Inquiry)
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_delete, sender=Testimonial)
+def expire_paginator_counts(sender, **kwargs):
+    invalidate_tags(count_tag(sender))
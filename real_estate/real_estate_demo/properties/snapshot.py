@@ -0,0 +1,220 @@
+from datetime import datetime, timedelta
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+
+import numpy as np
+from django.conf import settings
+
+from core.pagination import CursorPage, CursorPaginator, decode_cursor, encode_cursor
+from .columns import ColumnState, SyncedColumns, invalidate_columns
+from .features import features_mask, matches_mask
+from .filters import BEDROOM_BUCKETS, location_paths
+from .geo import EARTH_RADIUS_KM
+from .models import Location, Property, PropertyType
+
+
+VERSION_KEY = 'snapshot:version'
+EPOCH_KEY = 'snapshot:epoch'
+
+LISTING_TYPES = {value: code for code, (value, _) in enumerate(Property.LISTING_TYPE_CHOICES)}
+
+FIELDS = (
+    'id', 'price', 'area_sqft', 'bedrooms', 'property_type_id', 'location_id', 'listing_type',
+    'latitude', 'longitude', 'created_at', 'feature_mask', 'is_featured', 'is_published', 'updated_at',
+)
+
+COLUMNS = {
+    'ids': np.int64,
+    'price': np.int64,          # cents
+    'area': np.int32,
+    'bedrooms': np.int16,
+    'property_type': np.int32,
+    'location': np.int32,
+    'listing_type': np.int8,
+    'latitude': np.float32,     # NaN when unknown
+    'longitude': np.float32,
+    'created_at': np.int64,     # microseconds since the epoch
+    'features': np.uint64,
+    'featured': np.bool_,
+    'active': np.bool_,
+}
+
+
+def snapshot_enabled():
+    return getattr(settings, 'LISTING_SNAPSHOT', False)
+
+
+def invalidate_snapshot(full=False):
+    """Tell every worker its snapshot is stale; ``full`` forces a reload (after deletes)."""
+    invalidate_columns(VERSION_KEY, EPOCH_KEY, full)
+
+
+def to_micros(value):
+    return (value - datetime(1970, 1, 1, tzinfo=value.tzinfo)) // timedelta(microseconds=1)
+
+
+def to_cents(value, rounding=ROUND_FLOOR):
+    return int((Decimal(value) * 100).to_integral_value(rounding=rounding))
+
+
+class SnapshotResult:
+    """
+    Ordered ids of the listings matching a query. Slicing it loads just
+    those rows from ``queryset`` by primary key, so it can be handed to a
+    Paginator in place of a queryset.
+    """
+
+    def __init__(self, ids, created_at, queryset):
+        self.ids = ids
+        self.created_at = created_at
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            # Negative and out of range indexes behave as on a list
+            pk = int(self.ids[index])
+            row = self.queryset.in_bulk([pk]).get(pk)
+            if row is None:
+                raise IndexError(f'listing {pk} is no longer available')
+            return row
+        ids = self.ids[index].tolist()
+        rows = self.queryset.in_bulk(ids)
+        # Rows deleted or unpublished since the last sync are skipped
+        return [rows[pk] for pk in ids if pk in rows]
+
+
+class SnapshotCursorPaginator(CursorPaginator):
+    """Keyset pagination over a SnapshotResult, with the same cursors as the database paginator."""
+
+    def __init__(self, result, per_page):
+        super().__init__(result.queryset, per_page, ('-created_at', '-id'))
+        self.result = result
+
+    def page(self, cursor=None):
+        created_at, ids = self.result.created_at, self.result.ids
+        if not cursor:
+            start, has_previous = 0, False
+            end = self.per_page
+        else:
+            direction, values = decode_cursor(cursor)
+            created, pk = self._parse_values(values)
+            created = to_micros(created)
+            if direction == 'next':
+                # Skip every row at or before the cursor in (-created_at, -id) order
+                start = int(np.count_nonzero((created_at > created) | ((created_at == created) & (ids >= pk))))
+                end, has_previous = start + self.per_page, True
+            else:
+                end = int(np.count_nonzero((created_at > created) | ((created_at == created) & (ids > pk))))
+                start, has_previous = max(end - self.per_page, 0), end > self.per_page
+
+        has_next = end < len(ids)
+        rows = self.result[start:end]
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor('next', self._position(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor('prev', self._position(rows[0]))
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+class SnapshotState(ColumnState):
+    """One consistent version of the columns (see ColumnState)."""
+    COLUMNS = COLUMNS
+
+    def __init__(self):
+        super().__init__()
+        self.order = np.zeros(0, dtype=np.int64)
+
+    def set_row(self, i, row):
+        self.price[i] = to_cents(row['price'])
+        self.area[i] = row['area_sqft']
+        self.bedrooms[i] = row['bedrooms']
+        self.property_type[i] = row['property_type_id']
+        self.location[i] = row['location_id']
+        self.listing_type[i] = LISTING_TYPES.get(row['listing_type'], -1)
+        self.latitude[i] = row['latitude'] if row['latitude'] is not None else np.nan
+        self.longitude[i] = row['longitude'] if row['longitude'] is not None else np.nan
+        self.created_at[i] = to_micros(row['created_at'])
+        self.features[i] = row['feature_mask']
+        self.featured[i] = row['is_featured']
+        self.active[i] = row['is_published']
+
+    def finish(self):
+        # Newest first, ties broken by id like the database ordering
+        self.order = np.lexsort((-self.ids, -self.created_at))
+
+
+class ListingSnapshot(SyncedColumns):
+    """
+    Columnar copy of the listing table held in NumPy arrays. Filters become
+    vectorized masks over the columns and only the rows of the requested
+    page are read from the database. Kept in sync per worker (see
+    SyncedColumns).
+    """
+    state_class = SnapshotState
+    fields = FIELDS
+    version_key = VERSION_KEY
+    epoch_key = EPOCH_KEY
+
+    @property
+    def nbytes(self):
+        return self.state.nbytes
+
+    def _mask(self, state, filters, featured=False):
+        """Boolean mask of the rows matching normalized filters, or None if they can't be evaluated here."""
+        mask = state.active.copy()
+        if featured:
+            mask &= state.featured
+
+        if 'type' in filters:
+            type_ids = [row.pk for row in PropertyType.objects.cached() if row.slug == filters['type']]
+            mask &= np.isin(state.property_type, type_ids)
+        if 'location' in filters:
+            paths = tuple(location_paths(filters['location']))
+            location_ids = [row.pk for row in Location.objects.cached() if paths and row.path.startswith(paths)]
+            mask &= np.isin(state.location, location_ids)
+        if 'listing_type' in filters:
+            mask &= state.listing_type == LISTING_TYPES.get(filters['listing_type'], -2)
+        if 'bedrooms' in filters:
+            _, _, low, high = next(b for b in BEDROOM_BUCKETS if b[0] == filters['bedrooms'])
+            mask &= state.bedrooms >= low
+            if high is not None:
+                mask &= state.bedrooms <= high
+        if 'min_price' in filters:
+            mask &= state.price >= to_cents(filters['min_price'], ROUND_CEILING)
+        if 'max_price' in filters:
+            mask &= state.price <= to_cents(filters['max_price'])
+        if 'features' in filters:
+            bits, unmapped = features_mask(filters['features'])
+            if unmapped:
+                return None
+            if filters.get('features_mode', 'all') == 'all' and bin(bits).count('1') < len(filters['features']):
+                # One of the features does not exist
+                return np.zeros_like(mask)
+            mask &= matches_mask(state.features, np.uint64(bits), filters.get('features_mode', 'all'))
+        if 'bbox' in filters:
+            south, west, north, east = filters['bbox']
+            mask &= (state.latitude >= south) & (state.latitude <= north)
+            mask &= (state.longitude >= west) & (state.longitude <= east)
+        if 'radius' in filters:
+            lat0, lng0 = np.radians(filters['lat']), np.radians(filters['lng'])
+            lat, lng = np.radians(state.latitude), np.radians(state.longitude)
+            a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat) * np.cos(lat0) * np.sin((lng - lng0) / 2) ** 2
+            km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+            mask &= km <= filters['radius']
+        return mask
+
+    def query(self, filters, queryset, featured=False):
+        """Listings matching ``filters``, newest first, or None to fall back to the database."""
+        self.refresh()
+        state = self.state
+        mask = self._mask(state, filters, featured)
+        if mask is None:
+            return None
+        rows = state.order[mask[state.order]]
+        return SnapshotResult(state.ids[rows], state.created_at[rows], queryset)
+
+
+listing_snapshot = ListingSnapshot()
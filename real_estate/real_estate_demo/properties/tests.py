@@ -1,3 +1,918 @@
-from django.test import TestCase
+import io
+import os
+import re
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache import page_cache_key
+from core.jobs import claim, run
+from core.models import Job, OutboxEmail
+from core.outbox import deliver_outbox
+from core.pagination import CachedCountPaginator, encode_cursor
+
+from .autocomplete import location_autocomplete
+from .clusters import rebuild_clusters
+from .facets import get_facets
+from .filters import apply_filters, get_filters
+from .models import (
+    Agent, Location, Property, PropertyCluster, PropertyFeature, PropertyImage, PropertyType, SearchTerm,
+)
+from .recommender import invalidate_recommender, similarity_index
+from .search import search_properties
+from .snapshot import listing_snapshot
+from .uploads import ImageUploader, read_manifest
+
+
+class PropertyTestMixin:
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('agent', 'agent@example.com', 'password')
+        self.agent = Agent.objects.create(user=user, phone='123')
+        self.property_type = PropertyType.objects.create(name='House', slug='house')
+        self.location = Location.objects.create(name='Dhaka', slug='dhaka')
+
+    def create_properties(self, count, with_images=True, **kwargs):
+        start = Property.objects.count()
+        properties = []
+        for i in range(start, start + count):
+            defaults = {
+                'title': f'Property {i}',
+                'slug': f'property-{i}',
+                'description': 'Description',
+                'property_type': self.property_type,
+                'location': self.location,
+                'address': f'{i} Road',
+                'price': Decimal('100000'),
+                'bedrooms': 3,
+                'bathrooms': Decimal('2.0'),
+                'area_sqft': 1500,
+                'agent': self.agent,
+            }
+            defaults.update(kwargs)
+            property_obj = Property.objects.create(**defaults)
+            if with_images:
+                PropertyImage.objects.create(property=property_obj, image=f'properties/{i}', is_primary=True)
+                PropertyImage.objects.create(property=property_obj, image=f'properties/{i}-2', order=1)
+            properties.append(property_obj)
+        return properties
+
+    def count_queries(self, url):
+        # Reference tables are cached across requests; load them up front so
+        # only the per-request queries are counted
+        for model in (PropertyType, Location, PropertyFeature):
+            model.objects.cached()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+
+class PrimaryImageQueryCountTests(PropertyTestMixin, TestCase):
+    def test_home_query_count_independent_of_cards(self):
+        self.create_properties(1, is_featured=True)
+        few = self.count_queries(reverse('home'))
+        self.create_properties(5, is_featured=True)
+        self.assertEqual(self.count_queries(reverse('home')), few)
+
+    def test_property_list_query_count_independent_of_cards(self):
+        self.create_properties(2)
+        few = self.count_queries(reverse('property_list'))
+        self.create_properties(10)
+        self.assertEqual(self.count_queries(reverse('property_list')), few)
+
+    def test_property_detail_query_count_independent_of_similar_cards(self):
+        property_obj = self.create_properties(2)[0]
+        url = property_obj.get_absolute_url()
+        few = self.count_queries(url)
+        self.create_properties(3)
+        self.assertEqual(self.count_queries(url), few)
+
+    def test_search_query_count_independent_of_cards(self):
+        self.create_properties(2)
+        few = self.count_queries(reverse('property_search') + '?q=property')
+        self.create_properties(10)
+        self.assertEqual(self.count_queries(reverse('property_search') + '?q=property'), few)
+
+    def test_get_primary_image_uses_prefetched_value(self):
+        self.create_properties(1)
+        property_obj = Property.objects.with_primary_image().get()
+        with self.assertNumQueries(0):
+            self.assertEqual(property_obj.get_primary_image().name, 'properties/0')
+
+    def test_get_primary_image_without_images(self):
+        self.create_properties(1, with_images=False)
+        property_obj = Property.objects.with_primary_image().get()
+        self.assertIsNone(property_obj.get_primary_image())
+
+    def test_card_projection_loads_card_columns_and_image_in_one_query(self):
+        self.create_properties(1)
+        self.create_properties(1, with_images=False)
+        with self.assertNumQueries(1):
+            cards = list(Property.objects.for_cards().order_by('pk'))
+            self.assertEqual(cards[0].get_primary_image().name, 'properties/0')
+            self.assertIsNone(cards[1].get_primary_image())
+            self.assertEqual(cards[0].location.name, 'Dhaka')
+        self.assertLessEqual({'description', 'address', 'meta_description'}, cards[0].get_deferred_fields())
+
+
+class CursorPaginationTests(PropertyTestMixin, TestCase):
+    def collect_pages(self, url):
+        titles = []
+        page = self.client.get(url).context['page_obj']
+        titles.append([p.title for p in page])
+        while page.has_next():
+            page = self.client.get(f'{url}&cursor={page.next_cursor}').context['page_obj']
+            titles.append([p.title for p in page])
+        return page, titles
+
+    def test_walks_every_row_once_in_order(self):
+        self.create_properties(30, with_images=False)
+        url = reverse('property_list') + '?type=house'
+        last_page, pages = self.collect_pages(url)
+        self.assertEqual([len(titles) for titles in pages], [12, 12, 6])
+        expected = list(Property.objects.order_by('-created_at', '-id').values_list('title', flat=True))
+        self.assertEqual(sum(pages, []), expected)
+
+        previous = self.client.get(f'{url}&cursor={last_page.previous_cursor}').context['page_obj']
+        self.assertEqual([p.title for p in previous], pages[1])
+
+    def test_pagination_links_keep_filters(self):
+        self.create_properties(13, with_images=False)
+        response = self.client.get(reverse('property_list') + '?type=house&min_price=1')
+        self.assertEqual(response.context['pagination_query'], 'type=house&min_price=1')
+        self.assertContains(response, f'?type=house&amp;min_price=1&cursor={response.context["page_obj"].next_cursor}')
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse('property_list') + '?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_cursor_values_return_404(self):
+        for values in ([{'a': 1}, 1], [['2026-01-01'], 1], ['2026-01-01T00:00:00', {'a': 1}]):
+            cursor = encode_cursor('next', values)
+            response = self.client.get(reverse('property_list') + f'?cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
+
+    def test_page_parameter_keeps_offset_pagination(self):
+        self.create_properties(13, with_images=False)
+        response = self.client.get(reverse('property_list') + '?page=2')
+        self.assertFalse(response.context['cursor_pagination'])
+        self.assertEqual(len(response.context['properties']), 1)
+
+
+class PaginatorCountTests(PropertyTestMixin, TestCase):
+    def test_count_cached_until_model_written(self):
+        self.create_properties(3, with_images=False)
+        queryset = Property.objects.filter(is_published=True)
+        self.assertEqual(CachedCountPaginator(queryset, 2).count, 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedCountPaginator(queryset, 2).count, 3)
+        self.assertEqual(CachedCountPaginator(queryset.filter(bedrooms=4), 2).count, 0)
+
+        self.create_properties(1, with_images=False)
+        self.assertEqual(CachedCountPaginator(queryset, 2).count, 4)
+
+    def test_admin_changelist_uses_cached_count(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.create_properties(2, with_images=False)
+        url = reverse('admin:properties_property_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, '2 Properties')
+        self.assertFalse(response.context['cl'].paginator.approximate)
+        # Only the rows are queried again, not the count
+        filtered = url + '?status=available'
+        self.assertEqual(self.count_queries(filtered), self.count_queries(filtered) + 1)
+
+
+class SearchTests(PropertyTestMixin, TestCase):
+    def search(self, query):
+        return [row['property'] for row in search_properties(query)]
+
+    def test_title_match_ranks_above_description_match(self):
+        in_description, in_title = self.create_properties(2, with_images=False)
+        in_description.description = 'Quiet lakeside neighbourhood'
+        in_description.save()
+        in_title.title = 'Lakeside villa'
+        in_title.save()
+        self.assertEqual(self.search('lakeside'), [in_title.pk, in_description.pk])
+
+    def test_every_word_must_match(self):
+        garden, pool = self.create_properties(2, with_images=False)
+        garden.title = 'Family home with garden'
+        garden.save()
+        pool.title = 'Family home with pool'
+        pool.save()
+        self.assertEqual(sorted(self.search('family home')), sorted([garden.pk, pool.pk]))
+        self.assertEqual(self.search('family garden'), [garden.pk])
+        self.assertEqual(self.search('garden pool'), [])
+
+    def test_last_word_matches_as_prefix(self):
+        property_obj = self.create_properties(1, with_images=False, title='Spacious apartment')[0]
+        self.assertEqual(self.search('spacious apart'), [property_obj.pk])
+        # Only the word being typed is a prefix
+        self.assertEqual(self.search('spac apartment'), [])
+
+    def test_found_by_any_ancestor_region(self):
+        mirpur = Location.objects.create(name='Mirpur', slug='mirpur', parent=self.location)
+        dohs = Location.objects.create(name='DOHS', slug='dohs', parent=mirpur)
+        property_obj = self.create_properties(1, with_images=False, location=dohs)[0]
+        for query in ('dohs', 'mirpur', 'dhaka'):
+            self.assertEqual(self.search(query), [property_obj.pk])
+
+    def test_index_follows_saves_unpublishing_and_deletes(self):
+        property_obj = self.create_properties(1, with_images=False)[0]
+        property_obj.title = 'Riverside cottage'
+        property_obj.save()
+        self.assertEqual(self.search('riverside'), [property_obj.pk])
+        self.assertEqual(self.search('property'), [])
+
+        property_obj.is_published = False
+        property_obj.save()
+        self.assertEqual(self.search('riverside'), [])
+        self.assertFalse(SearchTerm.objects.filter(property=property_obj).exists())
+
+        property_obj.is_published = True
+        property_obj.save()
+        self.assertEqual(self.search('riverside'), [property_obj.pk])
+        property_obj.delete()
+        self.assertFalse(SearchTerm.objects.exists())
+
+
+class FacetTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.villa = PropertyType.objects.create(name='Villa', slug='villa')
+        self.create_properties(3, with_images=False, bedrooms=2, price=Decimal('90000'))
+        self.create_properties(2, with_images=False, bedrooms=6, property_type=self.villa, listing_type='rent')
+
+    def facets(self, **params):
+        return get_facets(get_filters(params))
+
+    def test_counts_every_facet_in_one_query(self):
+        with self.assertNumQueries(1):
+            facets = self.facets()
+        self.assertEqual(facets['total'], 5)
+        self.assertEqual(facets['type'], {'house': 3, 'villa': 2})
+        self.assertEqual({b['value']: b['count'] for b in facets['bedrooms']}['5+'], 2)
+        self.assertEqual({b['value']: b['count'] for b in facets['price']}['0-100000'], 3)
+
+    def test_facet_ignores_its_own_filter(self):
+        facets = self.facets(type='villa')
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['type'], {'house': 3, 'villa': 2})
+        self.assertEqual({b['value']: b['count'] for b in facets['listing_type']}, {'sale': 0, 'rent': 2})
+
+    def test_cached_until_a_property_changes(self):
+        self.facets(type='villa')
+        with self.assertNumQueries(0):
+            self.facets(type='villa')
+        self.create_properties(1, with_images=False, property_type=self.villa)
+        self.assertEqual(self.facets(type='villa')['total'], 3)
+
+
+class GeoSearchTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.near = self.create_properties(1, with_images=False, latitude=Decimal('23.8103'), longitude=Decimal('90.4125'))[0]
+        self.far = self.create_properties(1, with_images=False, latitude=Decimal('22.3569'), longitude=Decimal('91.7832'))[0]
+
+    def test_geohash_maintained_on_save(self):
+        self.assertEqual(self.near.geohash, 'wh0r3qs35')
+        self.near.latitude = None
+        self.near.save()
+        self.assertEqual(self.near.geohash, '')
+
+    def test_radius_search_orders_by_distance(self):
+        response = self.client.get(reverse('property_geo_search'), {'lat': '23.80', 'lng': '90.41', 'radius': '5'})
+        properties = response.json()['properties']
+        self.assertEqual([p['id'] for p in properties], [self.near.id])
+        self.assertAlmostEqual(properties[0]['distance_km'], 1.17, places=2)
+
+    def test_bbox_filter_on_property_list(self):
+        response = self.client.get(reverse('property_list'), {'bbox': '22,91,23,92'})
+        self.assertEqual(list(response.context['properties']), [self.far])
+
+    def test_geo_search_requires_an_area(self):
+        self.assertEqual(self.client.get(reverse('property_geo_search')).status_code, 400)
+
+
+class MapClusterTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = self.create_properties(
+            2, with_images=False, latitude=Decimal('23.8103'), longitude=Decimal('90.4125'),
+        )
+
+    def cluster(self, precision=5):
+        return PropertyCluster.objects.get(precision=precision, cell=self.first.geohash[:precision])
+
+    def test_clusters_follow_saves_incrementally(self):
+        self.second.price = Decimal('250000')
+        self.second.save()
+        cluster = self.cluster()
+        self.assertEqual((cluster.count, cluster.min_price, cluster.max_price), (2, Decimal('100000'), Decimal('250000')))
+
+        self.second.is_published = False
+        self.second.save()
+        cluster = self.cluster()
+        self.assertEqual((cluster.count, cluster.max_price), (1, Decimal('100000')))
+
+        self.first.delete()
+        self.assertFalse(PropertyCluster.objects.filter(cell=self.first.geohash[:5]).exists())
+
+    def test_incremental_matches_rebuild(self):
+        self.second.latitude = Decimal('22.3569')
+        self.second.save()
+        incremental = set(PropertyCluster.objects.values_list('precision', 'cell', 'count', 'min_price'))
+        rebuild_clusters()
+        self.assertEqual(set(PropertyCluster.objects.values_list('precision', 'cell', 'count', 'min_price')), incremental)
+
+    def test_cluster_endpoint(self):
+        response = self.client.get(reverse('property_clusters'), {'bbox': '23,90,24,91', 'zoom': '10'})
+        clusters = response.json()['clusters']
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0]['count'], 2)
+        self.assertAlmostEqual(clusters[0]['latitude'], 23.8103)
+
+
+class SimilarPropertyTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        similarity_index.__init__()
+        self.target, self.close, self.far = self.create_properties(3, with_images=False)
+        Property.objects.filter(pk=self.far.pk).update(price=Decimal('900000'), bedrooms=7)
+        invalidate_recommender()
+
+    def test_ranks_closest_listing_first(self):
+        self.assertEqual(similarity_index.similar(self.target.id, k=2), [self.close.id, self.far.id])
+
+    def test_picks_up_changes_from_other_processes(self):
+        similarity_index.similar(self.target.id)
+        self.close.is_published = False
+        self.close.save()
+        self.assertEqual(similarity_index.similar(self.target.id), [self.far.id])
+
+        self.far.delete()
+        self.assertEqual(similarity_index.similar(self.target.id), [])
+
+    def test_updates_publish_a_new_state(self):
+        similarity_index.similar(self.target.id)
+        state = similarity_index.state
+        self.create_properties(1, with_images=False)
+        similarity_index.similar(self.target.id)
+        # A reader holding the old state keeps consistent, unchanged arrays
+        self.assertIsNot(similarity_index.state, state)
+        self.assertEqual(len(state.ids), 3)
+        self.assertEqual(len(state.active), 3)
+        self.assertEqual(len(similarity_index.state.ids), 4)
+
+    def test_detail_page_uses_recommender(self):
+        response = self.client.get(self.target.get_absolute_url())
+        self.assertEqual(response.context['similar_properties'], [self.close, self.far])
+
+
+class LocationAutocompleteTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        location_autocomplete.__init__()
+        self.mirpur = Location.objects.create(name='Mirpur', slug='mirpur', parent=self.location)
+        self.mirsarai = Location.objects.create(name='Mirsarai', slug='mirsarai')
+        self.create_properties(2, with_images=False, location=self.mirpur)
+
+    def complete(self, query):
+        response = self.client.get(reverse('location_autocomplete'), {'q': query})
+        return [(result['label'], result['count']) for result in response.json()['results']]
+
+    def test_prefix_matches_ranked_by_listing_count(self):
+        self.assertEqual(self.complete('MIR'), [('Mirpur, Dhaka', 2), ('Mirsarai', 0)])
+
+    def test_matches_parent_qualified_names(self):
+        self.assertEqual(self.complete('mirpur, dh'), [('Mirpur, Dhaka', 2)])
+        self.assertEqual(self.complete(''), [])
+
+    def test_loaded_once_and_refreshed_on_location_change(self):
+        self.complete('mir')
+        with self.assertNumQueries(0):
+            location_autocomplete.complete('mir')
+        Location.objects.create(name='Mirzapur', slug='mirzapur')
+        self.assertIn(('Mirzapur', 0), self.complete('mirz'))
+
+    def test_counts_include_areas_below(self):
+        self.assertEqual(self.complete('dhaka'), [('Dhaka', 2)])
+
+    def test_reload_publishes_a_new_index(self):
+        self.complete('mir')
+        keys, entries = location_autocomplete.index
+        Location.objects.create(name='Mirzapur', slug='mirzapur')
+        location_autocomplete.load()
+        # A reader holding the old index still sees matching keys and entries
+        self.assertNotIn('mirzapur', keys)
+        self.assertEqual(len(keys), len(entries))
+        self.assertIn('mirzapur', location_autocomplete.index[0])
+
+
+class LocationHierarchyTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.mirpur = Location.objects.create(name='Mirpur', slug='mirpur', parent=self.location)
+        self.dohs = Location.objects.create(name='DOHS', slug='dohs', parent=self.mirpur)
+        self.chittagong = Location.objects.create(name='Chittagong', slug='chittagong')
+
+    def test_path_and_name_maintained_on_save(self):
+        self.assertEqual(self.dohs.path, f'{self.location.pk}/{self.mirpur.pk}/{self.dohs.pk}/')
+        self.assertEqual(str(self.dohs), 'DOHS, Mirpur, Dhaka')
+
+        self.mirpur.parent = self.chittagong
+        self.mirpur.save()
+        self.dohs.refresh_from_db()
+        self.assertEqual(self.dohs.path, f'{self.chittagong.pk}/{self.mirpur.pk}/{self.dohs.pk}/')
+        self.assertEqual(self.dohs.full_name, 'DOHS, Mirpur, Chittagong')
+
+        self.chittagong.name = 'Chattogram'
+        self.chittagong.save()
+        self.dohs.refresh_from_db()
+        self.assertEqual(self.dohs.full_name, 'DOHS, Mirpur, Chattogram')
+
+    def test_rename_reindexes_listings_in_a_job(self):
+        self.create_properties(1, location=self.dohs)
+        Job.objects.all().delete()
+        self.mirpur.name = 'Pallabi'
+        self.mirpur.save()
+        self.mirpur.save()
+        self.assertFalse(search_properties('pallabi').exists())
+
+        # Both saves share one queued job
+        self.assertEqual(
+            list(Job.objects.values_list('name', 'args')),
+            [('properties.jobs.reindex_location', [self.mirpur.pk])],
+        )
+        while (claimed := claim('test')) is not None:
+            run(claimed)
+        self.assertTrue(search_properties('pallabi').exists())
+
+    def test_cannot_move_under_own_descendant(self):
+        self.location.parent = self.dohs
+        with self.assertRaises(ValueError):
+            self.location.save()
+
+    def test_names_need_no_queries(self):
+        locations = list(Location.objects.all())
+        with self.assertNumQueries(0):
+            self.assertIn('DOHS, Mirpur, Dhaka', [str(location) for location in locations])
+
+    def test_filter_includes_areas_below(self):
+        self.create_properties(1, with_images=False)
+        self.create_properties(2, with_images=False, location=self.dohs)
+        self.create_properties(1, with_images=False, location=self.chittagong)
+
+        response = self.client.get(reverse('property_list'), {'location': 'dhaka'})
+        self.assertEqual(response.context['facets']['total'], 3)
+        self.assertEqual(len(response.context['properties']), 3)
+        counts = {location.slug: location.facet_count for location in response.context['locations']}
+        self.assertEqual(counts, {'dhaka': 3, 'chittagong': 1})
+        self.assertEqual(get_facets(get_filters({'location': 'mirpur'}))['total'], 2)
+
+    def test_typed_location_name_matches_like_its_slug(self):
+        self.create_properties(2, with_images=False, location=self.dohs)
+        self.create_properties(1, with_images=False, location=self.chittagong)
+        for typed in ('Mirpur', 'mirpur, dhaka', 'DOHS,Mirpur,  Dhaka'):
+            response = self.client.get(reverse('property_list'), {'location': typed})
+            self.assertEqual(len(response.context['properties']), 2, typed)
+
+
+class FeatureFilterTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.pool = PropertyFeature.objects.create(name='Pool')
+        self.garage = PropertyFeature.objects.create(name='Garage')
+        self.gym = PropertyFeature.objects.create(name='Gym')
+        self.both, self.pool_only, self.none = self.create_properties(3, with_images=False)
+        self.both.features.add(self.pool, self.garage)
+        self.pool_only.features.add(self.pool)
+
+    def listing_ids(self, params):
+        response = self.client.get(reverse('property_list'), params)
+        return {property_obj.pk for property_obj in response.context['properties']}
+
+    def test_mask_follows_m2m_changes(self):
+        self.assertEqual(self.both.feature_mask, 1 << self.pool.bit | 1 << self.garage.bit)
+        self.garage.property_set.add(self.none)
+        self.none.refresh_from_db()
+        self.assertEqual(self.none.feature_mask, 1 << self.garage.bit)
+
+        self.pool.property_set.clear()
+        self.both.refresh_from_db()
+        self.assertEqual(self.both.feature_mask, 1 << self.garage.bit)
+
+        self.garage.delete()
+        self.both.refresh_from_db()
+        self.assertEqual(self.both.feature_mask, 0)
+
+    def test_all_and_any_filters(self):
+        features = [self.pool.pk, self.garage.pk]
+        self.assertEqual(self.listing_ids({'features': features}), {self.both.pk})
+        self.assertEqual(
+            self.listing_ids({'features': features, 'features_mode': 'any'}), {self.both.pk, self.pool_only.pk}
+        )
+        self.assertEqual(self.listing_ids({'features': f'{self.pool.pk},999'}), set())
+
+    def test_single_bitwise_predicate(self):
+        queryset = apply_filters(Property.objects.all(), get_filters({'features': f'{self.pool.pk},{self.gym.pk}'}))
+        self.assertNotIn('JOIN', str(queryset.query))
+
+    def test_feature_facet_counts(self):
+        facets = get_facets(get_filters({'features': str(self.pool.pk)}))
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['features'], {self.pool.bit: 2, self.garage.bit: 1})
+
+
+class ListingSnapshotTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        listing_snapshot.__init__()
+        self.mirpur = Location.objects.create(name='Mirpur', slug='mirpur', parent=self.location)
+        self.pool = PropertyFeature.objects.create(name='Pool')
+        for i, property_obj in enumerate(self.create_properties(30, with_images=False)):
+            property_obj.price = Decimal(100000 + i * 25000)
+            property_obj.bedrooms = i % 5 + 1
+            property_obj.location = self.mirpur if i % 2 else self.location
+            property_obj.latitude, property_obj.longitude = Decimal('23.8') + Decimal(i) / 100, Decimal('90.4')
+            property_obj.save()
+            if i % 3 == 0:
+                property_obj.features.add(self.pool)
+
+    def listing_ids(self, params):
+        ids = []
+        while True:
+            response = self.client.get(reverse('property_list'), params)
+            ids += [property_obj.pk for property_obj in response.context['properties']]
+            if not response.context['page_obj'].has_next():
+                return ids
+            params = {**params, 'cursor': response.context['page_obj'].next_cursor}
+
+    def test_matches_database_results(self):
+        cases = [
+            {},
+            {'location': 'mirpur'},
+            {'bedrooms': '5+', 'min_price': '200000.01'},
+            {'max_price': '400000', 'listing_type': 'sale'},
+            {'features': str(self.pool.pk)},
+            {'lat': '23.9', 'lng': '90.4', 'radius': '20'},
+        ]
+        for params in cases:
+            expected = self.listing_ids(params)
+            cache.clear()
+            with self.settings(LISTING_SNAPSHOT=True):
+                self.assertEqual(self.listing_ids(params), expected, params)
+
+    @override_settings(LISTING_SNAPSHOT=True)
+    def test_reads_only_the_page_from_the_database(self):
+        self.client.get(reverse('property_list'))
+        with CaptureQueriesContext(connection) as queries:
+            listing_snapshot.query({'bedrooms': '1'}, Property.objects.all())[:12]
+        self.assertEqual(len(queries), 1)
+        self.assertIn('IN', queries[0]['sql'])
+
+    @override_settings(LISTING_SNAPSHOT=True)
+    def test_applies_deltas_from_other_processes(self):
+        self.assertEqual(len(listing_snapshot.query({'bedrooms': '1'}, Property.objects.all())), 6)
+        synced = listing_snapshot.synced_at
+        Property.objects.filter(bedrooms=1).update(is_published=False, updated_at=timezone.now())
+        self.create_properties(1, with_images=False, bedrooms=1)
+        self.assertEqual(len(listing_snapshot.query({'bedrooms': '1'}, Property.objects.all())), 1)
+        self.assertGreater(listing_snapshot.synced_at, synced)
+
+    @override_settings(LISTING_SNAPSHOT=True)
+    def test_updates_publish_a_new_state(self):
+        listing_snapshot.query({}, Property.objects.all())
+        state = listing_snapshot.state
+        self.create_properties(1, with_images=False)
+        listing_snapshot.query({}, Property.objects.all())
+        # A reader holding the old state keeps consistent, unchanged columns
+        self.assertIsNot(listing_snapshot.state, state)
+        self.assertEqual({len(getattr(state, name)) for name in ('ids', 'active', 'featured', 'order')}, {30})
+        self.assertEqual(len(listing_snapshot.state.ids), 31)
+
+    def test_result_indexed_like_a_list(self):
+        result = listing_snapshot.query({'bedrooms': '1'}, Property.objects.all())
+        self.assertEqual(result[-1].pk, result[len(result) - 1].pk)
+        self.assertEqual(result[0].pk, result[0:1][0].pk)
+        with self.assertRaises(IndexError):
+            result[len(result)]
+
+
+class PageCacheTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = self.create_properties(2)
+        self.list_url = reverse('property_list')
+        self.detail_url = self.first.get_absolute_url()
+
+    def test_anonymous_pages_served_from_cache(self):
+        for url in (reverse('home'), self.list_url, self.detail_url):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_expired_by_tags(self):
+        self.client.get(self.list_url)
+        self.first.title = 'Renamed listing'
+        self.first.save()
+        self.assertContains(self.client.get(self.list_url), 'Renamed listing')
+
+        # A rental is never among a sale's similar listings
+        other_detail = self.create_properties(1, listing_type='rent')[0].get_absolute_url()
+        self.client.get(self.detail_url)
+        self.client.get(other_detail)
+        PropertyImage.objects.create(property=self.first, image='properties/new', order=2)
+        with self.assertNumQueries(0):
+            self.client.get(other_detail)
+        self.assertGreater(self.count_queries(self.detail_url), 0)
+
+    def test_only_listing_fields_expire_other_pages(self):
+        other_detail = self.create_properties(1, listing_type='rent')[0].get_absolute_url()
+        self.client.get(other_detail)
+        self.first.description = 'New description'
+        self.first.save()
+        with self.assertNumQueries(0):
+            self.client.get(other_detail)
+
+        self.first.price = Decimal('200000')
+        self.first.save()
+        self.assertGreater(self.count_queries(other_detail), 0)
+
+    def test_agent_pages_kept_when_signing_in(self):
+        self.client.get(self.detail_url)
+        self.client.login(username='agent', password='password')
+        self.client.logout()
+        with self.assertNumQueries(0):
+            self.client.get(self.detail_url)
+
+        user = self.agent.user
+        user.first_name = 'Renamed'
+        user.save(update_fields=['first_name'])
+        self.assertContains(self.client.get(self.detail_url), 'Renamed')
+
+    def test_stale_page_served_while_recomputed_elsewhere(self):
+        self.client.get(self.list_url)
+        self.first.title = 'Renamed listing'
+        self.first.save()
+        cache.add(page_cache_key(self.client.get(self.list_url).wsgi_request) + ':lock', 1)
+        self.first.title = 'Renamed again'
+        self.first.save()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+        self.assertContains(response, 'Renamed listing')
+
+    def test_signed_in_users_share_the_cached_page(self):
+        anonymous = self.client.get(self.list_url).content.decode()
+        self.client.login(username='agent', password='password')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+        self.assertNotIn('data-username>agent<', response.content.decode())
+        self.assertEqual(len(response.content.decode()), len(anonymous))
+
+    def test_conditional_get_answered_without_rendering(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['Cache-Control'], 'max-age=0, must-revalidate')
+        self.assertIn(f'property:{self.first.pk}', response['Surrogate-Key'].split())
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        PropertyImage.objects.create(property=self.first, image='properties/new', order=2)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_csrf_token_filled_in_per_visitor(self):
+        first = self.client.get(reverse('home')).content.decode()
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(reverse('home'))
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        self.assertNotIn(token, first)
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+
+class ReferenceDataTests(PropertyTestMixin, TestCase):
+    def test_cached_rows_reloaded_after_save(self):
+        PropertyType.objects.cached()
+        with self.assertNumQueries(0):
+            self.assertEqual([row.slug for row in PropertyType.objects.cached()], ['house'])
+        PropertyType.objects.create(name='Villa', slug='villa')
+        self.assertEqual(sorted(row.slug for row in PropertyType.objects.cached()), ['house', 'villa'])
+
+    def test_detail_features_read_from_mask(self):
+        property_obj = self.create_properties(1)[0]
+        property_obj.features.add(PropertyFeature.objects.create(name='Pool'))
+        PropertyFeature.objects.cached()
+        with self.assertNumQueries(0):
+            self.assertEqual([feature.name for feature in property_obj.get_features()], ['Pool'])
+
+
+class ContactEmailTests(PropertyTestMixin, TestCase):
+    def test_inquiry_emails_queued_not_sent(self):
+        property_obj = self.create_properties(1)[0]
+        response = self.client.post(reverse('contact_agent'), {
+            'name': 'Buyer', 'email': 'buyer@example.com', 'message': 'Hello', 'property_id': property_obj.pk,
+        })
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            sorted(email.to for email in OutboxEmail.objects.all()),
+            [['agent@example.com'], ['buyer@example.com']],
+        )
+
+        deliver_outbox()
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_contact_form_emails_queued(self):
+        response = self.client.post(reverse('contact_form'), {
+            'name': 'Visitor', 'email': 'visitor@example.com', 'subject': 'Question', 'message': 'Hello',
+        })
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(OutboxEmail.objects.filter(status='pending').count(), 2)
+
+
+class ManagementCommandTests(PropertyTestMixin, TestCase):
+    def test_explain_queries(self):
+        self.create_properties(2)
+        output = io.StringIO()
+        call_command('explain_queries', stdout=output)
+        self.assertIn('Query plan check complete', output.getvalue())
+
+
+class WarmCacheTests(PropertyTestMixin, TransactionTestCase):
+    """Pages are rendered in threads with their own connections, which only see committed rows."""
+
+    def test_warm_cache_renders_the_popular_pages(self):
+        property_obj = self.create_properties(2)[0]
+        output = io.StringIO()
+        call_command('warm_cache', workers=1, stdout=output)
+        self.assertNotIn('error', output.getvalue())
+        self.assertIn(property_obj.get_absolute_url(), output.getvalue())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+
+    def test_populate_data_warms_the_cache_when_asked(self):
+        output = io.StringIO()
+        call_command('populate_data', warm_cache=True, stdout=output)
+        self.assertIn('Warmed', output.getvalue())
+        self.assertNotIn('error', output.getvalue())
+
+
+class FakeUploader:
+    def __init__(self, fail_for=()):
+        self.fail_for = set(fail_for)
+        self.lock = threading.Lock()
+        self.uploaded = []
+
+    def __call__(self, path, public_id):
+        if os.path.basename(path) in self.fail_for:
+            raise ConnectionError('timed out')
+        with self.lock:
+            self.uploaded.append(path)
+        return public_id
+
+
+class ImageUploadTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.manifest = os.path.join(self.directory.name, 'manifest.jsonl')
+        self.properties = self.create_properties(3, with_images=False)
+
+    def photo(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_duplicate_content_uploaded_once_in_batched_queries(self):
+        same = [self.photo('a.jpg', b'one'), self.photo('b.jpg', b'one')]
+        other = self.photo('c.jpg', b'two')
+        rows = [
+            {'property': 'property-0', 'path': same[0]},
+            {'property': 'Property 1', 'path': same[1], 'alt_text': 'Front'},
+            {'property': 'property-1', 'path': other},
+            {'property': 'missing', 'path': other},
+        ]
+        uploader = FakeUploader()
+        with CaptureQueriesContext(connection) as queries:
+            stats = ImageUploader(uploader, self.manifest, workers=4).run(rows)
+
+        self.assertEqual(len(uploader.uploaded), 2)
+        self.assertEqual(stats['created'], 3)
+        self.assertEqual(stats['failed'], 1)
+        statements = [query['sql'] for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        # Property lookup, existing images, one bulk insert, one job for the variants
+        self.assertEqual(len(statements), 4)
+        images = PropertyImage.objects.filter(property=self.properties[1]).order_by('order')
+        self.assertEqual([(image.is_primary, image.alt_text) for image in images], [(True, 'Front'), (False, '')])
+
+    def test_variants_queued_for_real_ids_when_backend_returns_none(self):
+        rows = [
+            {'property': 'property-0', 'path': self.photo('a.jpg', b'one')},
+            {'property': 'property-1', 'path': self.photo('b.jpg', b'two')},
+        ]
+        # As on MySQL, bulk_create leaves the new rows without a pk
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            ImageUploader(FakeUploader(), self.manifest).run(rows)
+        queued = Job.objects.get(name='properties.jobs.process_property_images').args[0]
+        self.assertEqual(sorted(queued), sorted(PropertyImage.objects.values_list('pk', flat=True)))
+
+    def test_rerun_resumes_from_manifest(self):
+        rows = [
+            {'property': 'property-0', 'path': self.photo('a.jpg', b'one')},
+            {'property': 'property-2', 'path': self.photo('b.jpg', b'two')},
+        ]
+        stats = ImageUploader(FakeUploader(fail_for={'b.jpg'}), self.manifest).run(rows)
+        self.assertEqual((stats['created'], stats['failed']), (1, 1))
+        self.assertEqual(len(read_manifest(self.manifest)), 1)
+
+        uploader = FakeUploader()
+        stats = ImageUploader(uploader, self.manifest).run(rows)
+        self.assertEqual(uploader.uploaded, [rows[1]['path']])
+        self.assertEqual((stats['reused'], stats['existing'], stats['created']), (1, 1, 1))
+        self.assertEqual(PropertyImage.objects.count(), 2)
+
+    def test_uploaded_file_stored_by_media_backend(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_BACKEND='core.media.LocalMediaBackend', MEDIA_ROOT=media_root,
+        ):
+            image = PropertyImage.objects.create(
+                property=self.properties[0], image=SimpleUploadedFile('Front.JPG', b'photo'),
+            )
+            image.refresh_from_db()
+            self.assertTrue(image.image.name.startswith('properties/'))
+            self.assertTrue(image.image.name.endswith('.jpg'))
+            self.assertEqual(image.image.url, f'/media/{image.image.name}')
+            self.assertTrue(os.path.isfile(os.path.join(media_root, image.image.name)))
+
+
+class ImageVariantTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_BACKEND='core.media.LocalMediaBackend', MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media_root.name
+        self.property_obj = self.create_properties(1, with_images=False)[0]
+
+    def upload(self, width, height):
+        from PIL import Image
+
+        output = io.BytesIO()
+        Image.new('RGB', (width, height), 'teal').save(output, 'JPEG')
+        return SimpleUploadedFile('photo.jpg', output.getvalue())
+
+    def test_variants_made_by_job_after_upload(self):
+        image = PropertyImage.objects.create(property=self.property_obj, image=self.upload(1000, 500), is_primary=True)
+        queued = Job.objects.get(name='properties.jobs.process_property_images')
+        self.assertEqual(queued.args, [[image.pk]])
+        run(claim('test'))
+
+        image.refresh_from_db()
+        self.assertEqual((image.width, image.height), (1000, 500))
+        self.assertEqual(
+            sorted((variant['format'], variant['width'], variant['height']) for variant in image.variants),
+            sorted((image_format, width, width // 2) for image_format in ('avif', 'webp') for width in (320, 640, 960, 1000)),
+        )
+        for variant in image.variants:
+            self.assertTrue(os.path.isfile(os.path.join(self.media_root, variant['url'].removeprefix('/media/'))))
+
+        content = self.client.get(reverse('property_list')).content.decode()
+        self.assertIn('<source type="image/avif" srcset="', content)
+        self.assertIn(f'{image.variants[0]["url"]} {image.variants[0]["width"]}w', content)
+        self.assertIn('loading="lazy"', content)
+
+    def test_new_picture_processed_again(self):
+        image = PropertyImage.objects.create(property=self.property_obj, image=self.upload(400, 300))
+        run(claim('test'))
+        image.refresh_from_db()
+        self.assertTrue(image.variants)
+
+        image.image = self.upload(800, 600)
+        image.save()
+        self.assertEqual(image.variants, [])
+        run(claim('test'))
+        image.refresh_from_db()
+        self.assertEqual(image.width, 800)
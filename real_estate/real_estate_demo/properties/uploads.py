@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.db import transaction
+from django.db.models import Q
+
+from core.cache import invalidate_tags
+from core.media import media_backend
+
+from .jobs import queue_image_processing
+from .models import Property, PropertyImage
+
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_ID_FOLDER = 'truster/properties'
+
+# Uploads are network bound; more threads than this mostly get throttled
+UPLOAD_WORKERS = 8
+
+# PropertyImage rows are written in batches of this size as uploads finish,
+# so an interrupted run loses at most one batch of rows (the manifest still
+# has the uploads, and the next run creates them without uploading again)
+CREATE_BATCH = 500
+
+HASH_CHUNK = 1024 * 1024
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def public_id_for(digest):
+    """Uploads are named after their content, so the same photo is stored once."""
+    return f'{PUBLIC_ID_FOLDER}/{digest[:32]}'
+
+
+def read_manifest(path):
+    """Content hash -> public id of every upload recorded in the manifest."""
+    manifest = {}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    manifest[entry['sha256']] = entry['public_id']
+                except (ValueError, KeyError):
+                    # A line cut short by a crash; that file is uploaded again
+                    continue
+    return manifest
+
+
+class ImageUploader:
+    """
+    Upload property photos and create their PropertyImage rows.
+
+    ``rows`` are dicts with ``property`` (slug or title), ``path`` and
+    optionally ``alt_text``. Files are hashed and uploaded by a pool of
+    ``workers`` threads through ``upload(path, public_id)`` (by default the
+    media backend's), which returns the stored name. Each finished upload
+    is appended to the manifest right away, so a rerun skips everything
+    already uploaded, and files with the same content are uploaded once.
+    Photos a property already has are not added again.
+    """
+
+    def __init__(self, upload=None, manifest_path=None, workers=UPLOAD_WORKERS, log=None):
+        self.upload = upload or media_backend().upload
+        self.manifest_path = manifest_path
+        self.workers = max(workers, 1)
+        self.log = log or logger.info
+        self.stats = {'uploaded': 0, 'reused': 0, 'created': 0, 'existing': 0, 'failed': 0}
+
+    def resolve_properties(self, keys):
+        """Property id for each slug or title, in one query."""
+        found = {}
+        properties = list(
+            Property.objects.filter(Q(slug__in=keys) | Q(title__in=keys)).values_list('id', 'slug', 'title')
+        )
+        # Slugs are unique, so they win over a title that happens to match
+        for pk, slug, title in properties:
+            found.setdefault(title, pk)
+        for pk, slug, title in properties:
+            found[slug] = pk
+        return found
+
+    def load_existing(self, property_ids):
+        """Public ids, next order and whether a primary image exists, per property."""
+        self.existing = set()
+        self.next_order = {}
+        self.has_primary = set()
+        images = PropertyImage.objects.filter(property_id__in=property_ids).values_list(
+            'property_id', 'image', 'order', 'is_primary'
+        )
+        for property_id, image, order, is_primary in images:
+            self.existing.add((property_id, str(image)))
+            self.next_order[property_id] = max(self.next_order.get(property_id, 1), order + 1)
+            if is_primary:
+                self.has_primary.add(property_id)
+
+    def fail(self, row, reason):
+        self.stats['failed'] += 1
+        self.log(f'{row["path"]}: {reason}')
+
+    def add_images(self, rows, public_id):
+        for row in rows:
+            property_id = row['property_id']
+            if (property_id, public_id) in self.existing:
+                self.stats['existing'] += 1
+                continue
+            self.existing.add((property_id, public_id))
+            self.pending.append(PropertyImage(
+                property_id=property_id,
+                image=public_id,
+                alt_text=row.get('alt_text') or '',
+                order=row['order'],
+            ))
+        if len(self.pending) >= CREATE_BATCH:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        # Uploads finish in any order; a property without a primary image
+        # gets the earliest listed photo of the batch
+        for image in sorted(self.pending, key=lambda image: image.order):
+            if image.property_id not in self.has_primary:
+                image.is_primary = True
+                self.has_primary.add(image.property_id)
+        # bulk_create skips the post_save signals, so queue the variants and
+        # expire the pages here
+        with transaction.atomic():
+            PropertyImage.objects.bulk_create(self.pending)
+            queue_image_processing(self.created_ids())
+        invalidate_tags(*{f'property:{image.property_id}' for image in self.pending})
+        self.stats['created'] += len(self.pending)
+        self.pending = []
+
+    def created_ids(self):
+        """Ids of the rows just bulk created; backends like MySQL don't return them."""
+        if all(image.pk is not None for image in self.pending):
+            return [image.pk for image in self.pending]
+        pairs = {(image.property_id, str(image.image)) for image in self.pending}
+        rows = PropertyImage.objects.filter(
+            property_id__in={property_id for property_id, _ in pairs}, image__in={image for _, image in pairs},
+        ).values_list('pk', 'property_id', 'image')
+        return [pk for pk, property_id, image in rows if (property_id, str(image)) in pairs]
+
+    def safe_hash(self, path):
+        try:
+            return file_hash(path)
+        except OSError as e:
+            return e
+
+    def run(self, rows):
+        rows = list(rows)
+        self.pending = []
+        properties = self.resolve_properties({row['property'] for row in rows})
+        valid = []
+        for row in rows:
+            if row['property'] not in properties:
+                self.fail(row, f'no property "{row["property"]}"')
+            else:
+                valid.append({**row, 'property_id': properties[row['property']]})
+        self.load_existing(set(properties.values()))
+        # Photos keep the order they are listed in, after the ones a property already has
+        for row in valid:
+            row['order'] = self.next_order.get(row['property_id'], 1)
+            self.next_order[row['property_id']] = row['order'] + 1
+
+        manifest = read_manifest(self.manifest_path)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            paths = list(dict.fromkeys(row['path'] for row in valid))
+            hashes = dict(zip(paths, pool.map(self.safe_hash, paths)))
+
+            by_hash = {}
+            for row in valid:
+                digest = hashes[row['path']]
+                if isinstance(digest, OSError):
+                    self.fail(row, digest.strerror or str(digest))
+                else:
+                    by_hash.setdefault(digest, []).append(row)
+
+            uploads = {}
+            for digest, hash_rows in by_hash.items():
+                if digest in manifest:
+                    self.stats['reused'] += 1
+                    self.add_images(hash_rows, manifest[digest])
+                else:
+                    uploads[pool.submit(self.upload, hash_rows[0]['path'], public_id_for(digest))] = digest
+
+            manifest_file = open(self.manifest_path, 'a') if self.manifest_path else None
+            try:
+                for future in as_completed(uploads):
+                    digest = uploads[future]
+                    try:
+                        public_id = future.result()
+                    except Exception as e:
+                        for row in by_hash[digest]:
+                            self.fail(row, f'upload failed: {e}')
+                        continue
+                    self.stats['uploaded'] += 1
+                    if manifest_file:
+                        manifest_file.write(json.dumps({'sha256': digest, 'public_id': public_id}) + '\n')
+                        manifest_file.flush()
+                    self.add_images(by_hash[digest], public_id)
+            finally:
+                if manifest_file:
+                    manifest_file.close()
+                self.flush()
+        return self.stats
@@ -8,6 +8,9 @@ urlpatterns = [
     path('search/', views.PropertySearchView.as_view(), name='property_search'),
     path('contact/', views.contact_agent, name='contact_agent'),
     path('contact-form/', views.contact_form, name='contact_form'),
+    path('api/properties/geo/', views.property_geo_search, name='property_geo_search'),
+    path('api/properties/clusters/', views.property_clusters, name='property_clusters'),
+    path('api/locations/autocomplete/', views.location_autocomplete_view, name='location_autocomplete'),
     path('api/favorites/add/', views.add_to_favorites, name='add_to_favorites'),
     path('api/favorites/remove/', views.remove_from_favorites, name='remove_from_favorites'),
 ]
\ No newline at end of file
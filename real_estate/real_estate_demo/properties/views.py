@@ -1,97 +1,223 @@
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView, DetailView, TemplateView
 from django.http import JsonResponse
-from django.db.models import Q
-from .models import Property, PropertyType, Location, Testimonial
-
-
-class HomeView(TemplateView):
+from django.urls import reverse
+from django.conf import settings
+from django.db import transaction
+from core.cache import CachedPageMixin, object_tag
+from core.outbox import queue_email
+from core.pagination import CachedCountPaginator, CursorPaginationMixin
+from .models import Property, PropertyFeature, PropertyType, Location, Testimonial
+from .autocomplete import location_autocomplete
+from .clusters import clusters_in_bbox
+from .facets import get_facets
+from .filters import apply_filters, get_filters
+from .geo import parse_bbox
+from .recommender import similarity_index
+from .search import search_properties, fetch_ranked
+from .snapshot import SnapshotCursorPaginator, SnapshotResult, listing_snapshot, snapshot_enabled
+
+
+# Maximum number of markers returned by the geo search endpoint
+GEO_SEARCH_LIMIT = 500
+
+
+class HomeView(CachedPageMixin, TemplateView):
     template_name = 'properties/home.html'
+    page_cache_tags = ('listings', 'locations', 'property_types', 'testimonials')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['featured_properties'] = Property.objects.filter(is_featured=True, is_published=True)[:6]
-        context['property_types'] = PropertyType.objects.all()
-        context['locations'] = Location.objects.filter(parent=None)[:6]
+        queryset = Property.objects.filter(is_published=True).for_cards()
+        if snapshot_enabled():
+            featured = listing_snapshot.query({}, queryset, featured=True)[:6]
+        else:
+            featured = list(queryset.filter(is_featured=True)[:6])
+        self.add_cache_tags(*[object_tag(property_obj) for property_obj in featured])
+        context['featured_properties'] = featured
+        context['property_types'] = PropertyType.objects.cached()
         context['testimonials'] = Testimonial.objects.filter(is_featured=True)[:3]
         return context
 
 
-class PropertyListView(ListView):
+class PropertyListView(CachedPageMixin, CursorPaginationMixin, ListView):
     model = Property
     template_name = 'properties/property_list.html'
     context_object_name = 'properties'
     paginate_by = 12
+    page_cache_tags = ('listings', 'locations', 'property_types', 'features')
     
     def get_queryset(self):
-        queryset = Property.objects.filter(is_published=True)
-        
-        # Filter by property type
-        property_type = self.request.GET.get('type')
-        if property_type:
-            queryset = queryset.filter(property_type__slug=property_type)
-        
-        # Filter by location
-        location = self.request.GET.get('location')
-        if location:
-            queryset = queryset.filter(location__slug=location)
-        
-        # Filter by price range
-        min_price = self.request.GET.get('min_price')
-        max_price = self.request.GET.get('max_price')
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        
-        return queryset
+        self.filters = get_filters(self.request.GET)
+        queryset = Property.objects.filter(is_published=True).for_cards()
+        if snapshot_enabled():
+            # Filter and order in memory; only the page's rows are read from the database
+            result = listing_snapshot.query(self.filters, queryset)
+            if result is not None:
+                return result
+        return apply_filters(queryset, self.filters)
+    
+    def get_cursor_paginator(self, queryset, page_size):
+        if isinstance(queryset, SnapshotResult):
+            return SnapshotCursorPaginator(queryset, page_size)
+        return super().get_cursor_paginator(queryset, page_size)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['property_types'] = PropertyType.objects.all()
-        context['locations'] = Location.objects.filter(parent=None)
+        self.add_cache_tags(*[object_tag(property_obj) for property_obj in context['properties']])
+        facets = get_facets(self.filters)
+        
+        property_types = PropertyType.objects.cached()
+        for property_type in property_types:
+            property_type.facet_count = facets['type'].get(property_type.slug, 0)
+        locations = [location for location in Location.objects.cached() if location.parent_id is None]
+        for location in locations:
+            location.facet_count = facets['location'].get(location.pk, 0)
+        features = PropertyFeature.objects.cached()
+        for feature in features:
+            feature.facet_count = facets['features'].get(feature.bit, 0)
+            feature.selected = feature.pk in self.filters.get('features', ())
+        
+        context['property_types'] = property_types
+        context['locations'] = locations
+        context['features'] = features
+        context['features_mode'] = self.filters.get('features_mode', 'all')
+        context['facets'] = facets
         return context
 
 
-class PropertyDetailView(DetailView):
+class PropertyDetailView(CachedPageMixin, DetailView):
     model = Property
     template_name = 'properties/property_detail.html'
     context_object_name = 'property'
+    # Similar listings are drawn from the whole catalogue
+    page_cache_tags = ('listings', 'locations', 'property_types', 'features')
+    
+    def get_queryset(self):
+        return (
+            Property.objects
+            .select_related('property_type', 'location', 'agent__user')
+            .prefetch_related('images')
+            .with_primary_image()
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        property_obj = self.get_object()
-        context['similar_properties'] = Property.objects.filter(
-            property_type=property_obj.property_type,
-            location=property_obj.location,
-            is_published=True
-        ).exclude(id=property_obj.id)[:4]
+        similar_ids = similarity_index.similar(self.object.id, k=4)
+        similar = Property.objects.filter(is_published=True).for_cards().in_bulk(similar_ids)
+        context['similar_properties'] = [similar[pk] for pk in similar_ids if pk in similar]
+        self.add_cache_tags(
+            object_tag(self.object),
+            object_tag(self.object.agent),
+            *[object_tag(property_obj) for property_obj in context['similar_properties']],
+        )
         return context
 
 
 class PropertySearchView(TemplateView):
     template_name = 'properties/search_results.html'
+    paginate_by = 12
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        query = self.request.GET.get('q', '')
+        query = self.request.GET.get('q', '').strip()
+        page_number = self.request.GET.get('page')
         
         if query:
-            properties = Property.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(address__icontains=query) |
-                Q(location__name__icontains=query),
-                is_published=True
+            # Rank through the inverted index, then load only the rows on this page
+            paginator = CachedCountPaginator(search_properties(query), self.paginate_by)
+            page_obj = paginator.get_page(page_number)
+            properties = fetch_ranked(
+                page_obj.object_list,
+                Property.objects.for_cards(),
             )
         else:
-            properties = Property.objects.filter(is_published=True)
+            queryset = Property.objects.filter(is_published=True).for_cards()
+            if snapshot_enabled():
+                queryset = listing_snapshot.query({}, queryset)
+            paginator = CachedCountPaginator(queryset, self.paginate_by)
+            page_obj = paginator.get_page(page_number)
+            properties = page_obj.object_list
         
         context['properties'] = properties
+        context['paginator'] = paginator
+        context['page_obj'] = page_obj
+        context['is_paginated'] = page_obj.has_other_pages()
         context['query'] = query
         return context
 
 
+def property_geo_search(request):
+    filters = get_filters(request.GET)
+    if 'bbox' not in filters and 'radius' not in filters:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Provide bbox=south,west,north,east or lat, lng and radius.'
+        }, status=400)
+    
+    queryset = apply_filters(Property.objects.filter(is_published=True), filters)
+    fields = ['id', 'title', 'slug', 'price', 'latitude', 'longitude']
+    if 'radius' in filters:
+        # Nearest first when searching around a point
+        queryset = queryset.order_by('distance')
+        fields.append('distance')
+    
+    results = []
+    for row in queryset.values(*fields)[:GEO_SEARCH_LIMIT]:
+        result = {
+            'id': row['id'],
+            'title': row['title'],
+            'url': reverse('property_detail', kwargs={'slug': row['slug']}),
+            'price': float(row['price']),
+            'latitude': float(row['latitude']),
+            'longitude': float(row['longitude']),
+        }
+        if 'distance' in row:
+            result['distance_km'] = round(row['distance'], 3)
+        results.append(result)
+    
+    return JsonResponse({'status': 'success', 'count': len(results), 'properties': results})
+
+
+def property_clusters(request):
+    bbox = parse_bbox(request.GET.get('bbox'))
+    try:
+        zoom = int(request.GET.get('zoom', ''))
+    except ValueError:
+        zoom = None
+    if bbox is None or zoom is None:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Provide bbox=south,west,north,east and zoom.'
+        }, status=400)
+    
+    clusters = [
+        {
+            'cell': cluster.cell,
+            'count': cluster.count,
+            'latitude': round(cluster.latitude, 6),
+            'longitude': round(cluster.longitude, 6),
+            'min_price': float(cluster.min_price),
+            'max_price': float(cluster.max_price),
+        }
+        for cluster in clusters_in_bbox(*bbox, zoom)
+    ]
+    return JsonResponse({'status': 'success', 'zoom': zoom, 'clusters': clusters})
+
+
+def location_autocomplete_view(request):
+    results = [
+        {
+            'name': entry['name'],
+            'label': entry['label'],
+            'slug': entry['slug'],
+            'count': entry['count'],
+        }
+        for entry in location_autocomplete.complete(request.GET.get('q', ''))
+    ]
+    return JsonResponse({'status': 'success', 'results': results})
+
+
 def contact_agent(request):
     if request.method == 'POST':
         try:
@@ -121,24 +247,21 @@ def contact_agent(request):
                         'message': 'Property not found.'
                     })
             
-            # Create inquiry
+            # Create inquiry and queue its emails together; send_outbox delivers them
             from .models import Inquiry
-            inquiry = Inquiry.objects.create(
-                property=property_obj,
-                inquiry_type=inquiry_type,
-                name=name,
-                email=email,
-                phone=phone,
-                message=message,
-                status='new'
-            )
-            
-            # Send email notification to agent
-            try:
-                from django.core.mail import send_mail
-                from django.conf import settings
+            with transaction.atomic():
+                inquiry = Inquiry.objects.create(
+                    property=property_obj,
+                    inquiry_type=inquiry_type,
+                    name=name,
+                    email=email,
+                    phone=phone,
+                    message=message,
+                    status='new'
+                )
                 
                 if property_obj and property_obj.agent:
+                    # Notification to agent
                     agent_email = property_obj.agent.user.email
                     subject = f'New Inquiry for {property_obj.title}'
                     message_content = f"""
@@ -161,15 +284,9 @@ Best regards,
 TRUSTER Team
                     """
                     
-                    send_mail(
-                        subject,
-                        message_content,
-                        settings.DEFAULT_FROM_EMAIL,
-                        [agent_email],
-                        fail_silently=True,
-                    )
+                    queue_email(subject, message_content, [agent_email])
                     
-                    # Send confirmation email to customer
+                    # Confirmation to customer
                     customer_subject = 'Thank you for your inquiry - TRUSTER'
                     customer_message = f"""
 Dear {name},
@@ -188,17 +305,7 @@ Best regards,
 TRUSTER Team
                     """
                     
-                    send_mail(
-                        customer_subject,
-                        customer_message,
-                        settings.DEFAULT_FROM_EMAIL,
-                        [email],
-                        fail_silently=True,
-                    )
-                    
-            except Exception as e:
-                # Email sending failed, but inquiry was still created
-                pass
+                    queue_email(customer_subject, customer_message, [email])
             
             return JsonResponse({
                 'status': 'success', 
@@ -334,23 +441,20 @@ def contact_form(request):
                     'message': 'Please fill in all required fields.'
                 })
             
-            # Create contact inquiry
+            # Create contact inquiry and queue its emails together; send_outbox delivers them
             from .models import Contact
-            contact = Contact.objects.create(
-                name=name,
-                email=email,
-                phone=phone,
-                inquiry_type=inquiry_type,
-                subject=subject,
-                message=message,
-                status='new'
-            )
-            
-            # Send email notification to admin
-            try:
-                from django.core.mail import send_mail
-                from django.conf import settings
+            with transaction.atomic():
+                contact = Contact.objects.create(
+                    name=name,
+                    email=email,
+                    phone=phone,
+                    inquiry_type=inquiry_type,
+                    subject=subject,
+                    message=message,
+                    status='new'
+                )
                 
+                # Notification to admin
                 admin_subject = f'New Contact Inquiry - {subject}'
                 admin_message = f"""
 New contact inquiry received:
@@ -372,15 +476,9 @@ Best regards,
 TRUSTER System
                 """
                 
-                send_mail(
-                    admin_subject,
-                    admin_message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [settings.DEFAULT_FROM_EMAIL],  # Send to admin
-                    fail_silently=True,
-                )
+                queue_email(admin_subject, admin_message, [settings.DEFAULT_FROM_EMAIL])
                 
-                # Send confirmation email to customer
+                # Confirmation to customer
                 customer_subject = 'Thank you for contacting us - TRUSTER'
                 customer_message = f"""
 Dear {name},
@@ -399,17 +497,7 @@ Best regards,
 TRUSTER Team
                 """
                 
-                send_mail(
-                    customer_subject,
-                    customer_message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [email],
-                    fail_silently=True,
-                )
-                
-            except Exception as e:
-                # Email sending failed, but inquiry was still created
-                pass
+                queue_email(customer_subject, customer_message, [email])
             
             return JsonResponse({
                 'status': 'success', 
@@ -166,6 +166,30 @@ CLOUDINARY_STORAGE = {
 # Default file storage
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+# Where property, agent and testimonial images live (core/media.py).
+# core.media.LocalMediaBackend keeps them under MEDIA_ROOT and makes resized
+# variants with Pillow, kept in MEDIA_VARIANT_ROOT up to
+# MEDIA_VARIANT_CACHE_SIZE bytes; use it to run the site offline or to
+# benchmark without the CDN.
+MEDIA_BACKEND = os.environ.get('MEDIA_BACKEND', 'core.media.CloudinaryMediaBackend')
+MEDIA_VARIANT_ROOT = BASE_DIR / "media_variants"
+MEDIA_VARIANT_CACHE_SIZE = 512 * 1024 * 1024
+
+# Serve public listing pages from an in-process NumPy snapshot of the
+# listing table (properties/snapshot.py) instead of filtering in SQL
+LISTING_SNAPSHOT = False
+
+# Background jobs (core/jobs.py) are queued in the database and run by
+# `manage.py run_jobs`. JOBS_EAGER runs them inline instead; JOBS_REDIS_URL
+# lets idle workers wake up as soon as a job is queued instead of polling.
+JOBS_EAGER = False
+JOBS_REDIS_URL = None
+
+# Re-render expired popular pages every 10 minutes in the job worker
+# (properties.jobs.warm_page_cache). Only useful once CACHES points at a
+# backend the web processes share; the default locmem cache is per process.
+WARM_PAGE_CACHE = False
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -25,9 +25,10 @@ urlpatterns = [
     path("", include("properties.urls")),
     path("accounts/", include("accounts.urls")),
     path("admin-portal/", include("admin_portal.urls")),
+    # Uploaded images and their resized variants (local media backend)
+    path(settings.MEDIA_URL.lstrip("/"), include("core.urls")),
 ]
 
-# Serve media files during development
+# Serve static files during development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
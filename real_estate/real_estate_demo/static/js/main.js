@@ -3,6 +3,7 @@
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize all components
     initializeNavbar();
+    initializePersonalization();
     initializeSearchForm();
     initializePropertyCards();
     initializeAnimations();
@@ -23,29 +24,126 @@ function initializeNavbar() {
     });
 }
 
+// Cached pages are shared by every visitor: fetch the user specific parts
+function initializePersonalization() {
+    const userMenu = document.getElementById('user-menu');
+    if (!userMenu) return;
+    const sharedPage = userMenu.hasAttribute('data-shared-page');
+    if (!sharedPage && !document.querySelector('.favorite-btn')) return;
+    
+    fetch(userMenu.dataset.personalizationUrl, { credentials: 'same-origin' })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.authenticated) return;
+            if (sharedPage) {
+                renderUserMenu(userMenu, data);
+            }
+            const favorites = new Set(data.favorites.map(String));
+            document.querySelectorAll('.favorite-btn').forEach(button => {
+                if (!favorites.has(button.dataset.propertyId)) return;
+                const icon = button.querySelector('i');
+                icon.classList.remove('far');
+                icon.classList.add('fas');
+                icon.style.color = '#ef4444';
+            });
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+function renderUserMenu(userMenu, data) {
+    const template = document.getElementById('user-menu-template');
+    if (!template) return;
+    const menu = template.content.cloneNode(true);
+    menu.querySelector('[data-username]').textContent = data.username;
+    if (!data.is_staff) {
+        menu.querySelectorAll('[data-staff-only]').forEach(item => item.remove());
+    }
+    userMenu.replaceChildren(menu);
+}
+
 // Search form functionality
 function initializeSearchForm() {
-    const searchForm = document.querySelector('.search-form');
+    const searchForm = document.querySelector('.search-form, .search-form-inline form');
     if (!searchForm) return;
     
     // Handle search form submission
     searchForm.addEventListener('submit', function(e) {
         e.preventDefault();
-        handlePropertySearch();
+        handlePropertySearch(searchForm);
     });
     
     // Auto-complete for location field
     const locationInput = document.querySelector('#location');
-    if (locationInput) {
-        locationInput.addEventListener('input', function() {
-            // Implement location autocomplete here
-        });
+    if (locationInput && locationInput.tagName === 'INPUT') {
+        initializeLocationAutocomplete(locationInput);
     }
 }
 
+// Location autocomplete backed by /api/locations/autocomplete/
+function initializeLocationAutocomplete(input) {
+    const list = document.createElement('ul');
+    list.className = 'autocomplete-list list-unstyled';
+    list.hidden = true;
+    input.parentNode.style.position = 'relative';
+    input.parentNode.appendChild(list);
+    
+    let timer = null;
+    let lastQuery = '';
+    
+    input.addEventListener('input', function() {
+        // Typing again invalidates a previously picked location
+        delete input.dataset.slug;
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            const query = input.value.trim();
+            if (query === lastQuery) return;
+            lastQuery = query;
+            if (!query) {
+                list.hidden = true;
+                return;
+            }
+            fetch(`/api/locations/autocomplete/?q=${encodeURIComponent(query)}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (query !== lastQuery) return;
+                    renderLocationSuggestions(input, list, data.results || []);
+                })
+                .catch(error => console.error('Error:', error));
+        }, 150);
+    });
+    
+    input.addEventListener('blur', function() {
+        // Give clicks on a suggestion time to register
+        setTimeout(() => { list.hidden = true; }, 150);
+    });
+}
+
+function renderLocationSuggestions(input, list, results) {
+    list.innerHTML = '';
+    results.forEach(result => {
+        const item = document.createElement('li');
+        item.className = 'autocomplete-item';
+        item.textContent = result.label;
+        
+        const count = document.createElement('span');
+        count.className = 'text-muted small ms-2';
+        count.textContent = `(${result.count})`;
+        item.appendChild(count);
+        
+        item.addEventListener('mousedown', function(e) {
+            e.preventDefault();
+            input.value = result.label;
+            input.dataset.slug = result.slug;
+            list.hidden = true;
+        });
+        list.appendChild(item);
+    });
+    list.hidden = results.length === 0;
+}
+
 // Property search handler
-function handlePropertySearch() {
-    const formData = new FormData(document.querySelector('.search-form'));
+function handlePropertySearch(searchForm) {
+    const formData = new FormData(searchForm);
     const searchParams = new URLSearchParams();
     
     for (let [key, value] of formData.entries()) {
@@ -54,6 +152,12 @@ function handlePropertySearch() {
         }
     }
     
+    // Send the slug of a location picked from the autocomplete
+    const locationInput = document.querySelector('#location');
+    if (locationInput && locationInput.dataset.slug) {
+        searchParams.set('location', locationInput.dataset.slug);
+    }
+    
     // Redirect to search results
     window.location.href = `/properties/?${searchParams.toString()}`;
 }